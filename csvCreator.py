@@ -39,6 +39,9 @@ import pandas as pd
 from functions.export_and_plot_shape import export_and_plot_shape
 from functions.trajectories import *
 from functions.create_active_csv import create_active_csv
+from functions.trajectory_binary import binary_path
+from functions.trajectory_cache import TrajectoryCache
+from functions.trajectory_simplify import simplify_file
 
 # Example usage
 shape_name="heart_shape"
@@ -53,8 +56,20 @@ move_speed = 2.0  # m/s
 hold_time = 4.0 #s
 step_time = 0.1 #s
 output_file = "shapes/active.csv"
+plot_file = "shapes/trajectory_plot.png"
 
-create_active_csv(
+# Reuse previously generated trajectories when every parameter above is unchanged
+USE_CACHE = True
+CACHE_DIR = "shapes/cache"
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+# Also write active.simplified.traj, without the samples of holds and straight legs that playback can interpolate
+SIMPLIFY = False
+position_tolerance = 0.02  # m
+velocity_tolerance = 0.05  # m/s
+acceleration_tolerance = 0.2  # m/s²
+
+params = dict(
     shape_name=shape_name,
     diameter=diameter,
     direction=direction,
@@ -66,9 +81,29 @@ create_active_csv(
     move_speed = move_speed,
     hold_time = hold_time,
     step_time = step_time,
-    output_file = output_file,
 )
 
-output_file = "shapes/active.csv"
-export_and_plot_shape(output_file)
+# Files stored with each cache entry and where they are restored to
+cached_files = {
+    "active.csv": output_file,
+    "active.traj": binary_path(output_file),
+    "trajectory_plot.png": plot_file,
+}
+
+cache = TrajectoryCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES) if USE_CACHE else None
+trajectory = cache.get(params) if cache else None
+
+if trajectory is not None and cache.restore(params, cached_files):
+    print(f"Restored {output_file} and {plot_file} from the trajectory cache.")
+else:
+    trajectory = create_active_csv(**params, output_file=output_file)
+    export_and_plot_shape(output_file, trajectory)
+    if cache:
+        cache.put(params, trajectory, cached_files)
 
+if SIMPLIFY:
+    result = simplify_file(output_file, position_tolerance, velocity_tolerance, acceleration_tolerance)
+    if result['ok']:
+        print(f"Saved {result['output']} with {result['kept']}/{result['samples']} samples.")
+    else:
+        print(f"Error simplifying {output_file}: {result['error']}")
@@ -0,0 +1,81 @@
+# functions/build_manifest.py
+
+import hashlib
+import json
+import os
+
+from functions.spline_trajectory import spline_path
+
+
+def file_hash(path):
+    """
+    Return the SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Records what each Skybrush input was last processed from, so a show can be rebuilt incrementally.
+
+    For every input file the manifest stores its content hash and the processing settings
+    (interpolation method, dt, output mode). An input needs rebuilding when it is new, its
+    content or the settings changed, or its processed output is missing.
+
+    Args:
+        path (str): JSON file holding the manifest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.inputs = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.inputs = json.load(file).get("inputs", {})
+
+    def changes(self, skybrush_dir, processed_dir, settings):
+        """
+        Find the inputs that need to be rebuilt.
+
+        Args:
+            skybrush_dir (str): Directory with the Skybrush CSV files.
+            processed_dir (str): Directory with the processed outputs.
+            settings (dict): Processing settings, e.g. {'method': 'cubic', 'dt': 0.05, 'output': 'both'}.
+
+        Returns:
+            dict: {filename: sha256} for every input that changed.
+        """
+        changed = {}
+        for filename in sorted(os.listdir(skybrush_dir)):
+            if not filename.endswith(".csv"):
+                continue
+            sha256 = file_hash(os.path.join(skybrush_dir, filename))
+            entry = self.inputs.get(filename)
+            output = os.path.join(processed_dir, filename)
+            output_exists = os.path.exists(output) or os.path.exists(spline_path(output))
+            if entry is None or entry["sha256"] != sha256 or entry["settings"] != settings or not output_exists:
+                changed[filename] = sha256
+        return changed
+
+    def removed(self, skybrush_dir):
+        """
+        Return the recorded inputs that no longer exist in skybrush_dir.
+        """
+        return [filename for filename in self.inputs if not os.path.exists(os.path.join(skybrush_dir, filename))]
+
+    def record(self, filename, sha256, settings):
+        """
+        Mark an input as built from the given content and settings.
+        """
+        self.inputs[filename] = {"sha256": sha256, "settings": settings}
+
+    def forget(self, filename):
+        self.inputs.pop(filename, None)
+
+    def save(self):
+        with open(self.path, "w") as file:
+            json.dump({"version": 1, "inputs": self.inputs}, file, indent=2, sort_keys=True)
@@ -70,237 +70,168 @@ Flight Modes and Codes:
 
 
 
-import csv
 import math
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
 import pandas as pd
 from functions.trajectories import *
+from functions.trajectory_binary import binary_path, write_trajectory_binary
 
 
 
 
 
-def create_active_csv(shape_name,diameter, direction, maneuver_time, start_x, start_y, initial_altitude, climb_rate,move_speed, hold_time , step_time, output_file="active.csv"):
+ACTIVE_CSV_HEADER = ["idx", "t", "px", "py", "pz", "vx", "vy", "vz", "ax", "ay", "az", "yaw", "mode", "ledr", "ledg", "ledb"]
 
-    map_shape_to_code(shape_name)
+
+def _segment(t, x, y, z, vx, vy, vz, ax, ay, az, mode):
+    """
+    Build one flight phase as a block of rows in ACTIVE_CSV_HEADER column order.
+
+    Every argument may be a scalar or an array of len(t). The idx column is left at 0 and
+    filled in once all segments are concatenated; yaw is 0 and the LED columns are NaN.
+    """
+    block = np.zeros((len(t), len(ACTIVE_CSV_HEADER)))
+    block[:, 1:11] = np.column_stack(np.broadcast_arrays(t, x, y, z, vx, vy, vz, ax, ay, az))
+    block[:, 12] = mode
+    block[:, 13:16] = np.nan
+    return block
+
+
+def build_active_trajectory(shape_name, diameter, direction, maneuver_time, start_x, start_y, initial_altitude, climb_rate, move_speed, hold_time, step_time):
+    """
+    Build the full active trajectory (modes 10 through 90) as one NumPy array.
+
+    Each flight phase is generated as its own block, the blocks are concatenated once and
+    the idx column is numbered from 0.
+
+    Returns:
+        np.ndarray: (N, 16) array with the columns of ACTIVE_CSV_HEADER.
+    """
     shape_code, shape_fcn, shape_args = map_shape_to_code(shape_name)
+    shape_array_fcn = get_array_trajectory(shape_fcn)
 
     # The function returns the code, function, and arguments associated with the given shape name
     print(f"Shape Code: {shape_code}")
     print(f"Shape Function: {shape_fcn}")
     print(f"Shape Arguments: {shape_args}")
-   
-   
-    header = ["idx", "t", "px", "py", "pz", "vx", "vy", "vz", "ax", "ay", "az", "yaw", "mode", "ledr", "ledg", "ledb"]
-
-    with open(output_file, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-
-
-
-        # Calculate climb time and steps
-        climb_time = initial_altitude / climb_rate
-        climb_steps = int(climb_time / step_time)
-        # Write climb trajectory
-        for i in range(climb_steps):
-            t = i * step_time
-            x = 0
-            y = 0
-            z = (climb_rate * t) * -1
-            vx = 0.0
-            vy = 0.0
-            vz = -climb_rate
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode =10
-            row = [i, t, x, y, z, vx, vy, vz, ax, ay, az, yaw,mode, "nan", "nan", "nan"]
-            writer.writerow(row)
-
-
-        # Hold at intial altitude
-        hold_steps = int(hold_time / step_time)
-
-        for i in range(hold_steps):
-            t = climb_time + i * step_time
-            x = 0
-            y = 0
-            z = -1 * initial_altitude
-            vx = 0.0
-            vy = 0.0
-            vz = 0.0
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode = 20
-            row = [climb_steps + i, t, x, y, z, vx, vy, vz, 0,0,0, yaw,mode, "nan", "nan", "nan"]
-            writer.writerow(row)  
 
-    # Di chuyển đến vị trí bắt đầu
-        move_start_distance = math.sqrt(start_x**2 + start_y**2)
-        move_start_time = move_start_distance / move_speed
-        move_start_steps = int(move_start_time / step_time)
-
-        for i in range(move_start_steps):
-            t = climb_time + hold_time+ i * step_time
-            ratio = i / move_start_steps
-            x = start_x * ratio
-            y = start_y * ratio
-            z = -1 * initial_altitude
-            vx = move_speed * (start_x / move_start_distance)
-            vy = move_speed * (start_y / move_start_distance)
-            vz = 0.0
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode = 30
-            row = [climb_steps + hold_steps + i, t, x, y, z, vx, vy, vz, 0 , 0 ,0, yaw,mode, "nan", "nan", "nan"]
-            writer.writerow(row)
+    segments = []
+    z_hold = -1 * initial_altitude
 
-    # Hold start position for n seconds
-        hold_steps = int(hold_time / step_time)
-
-        for i in range(hold_steps):
-            t = climb_time + hold_time +move_start_time + i * step_time
-            x = start_x
-            y = start_y
-            z = -1 * initial_altitude
-            vx = 0.0
-            vy = 0.0
-            vz = 0.0
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode = 40
-            row = [climb_steps + hold_steps + move_start_steps + i, t, x, y, z, vx, vy, vz, 0, 0, 0, yaw,mode, "nan", "nan", "nan"]
-            writer.writerow(row)    
-
-        # Check if start position is different from first setpoint of maneuver
-        if 0 != shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[0] or 0 != shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[1]:
-            print("different Start and Manuever")
-            maneuver_start_x = shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[0];
-            maneuver_start_y = shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[1];
-            
-            print(f"Origin Start: {start_x} , {start_y}")
-            print(f"Manuever Start: {maneuver_start_x} , {maneuver_start_y}")
-
-            # Calculate distance and time required to move to first setpoint of maneuver
-            move_distance = math.sqrt(( maneuver_start_x)**2 + ( maneuver_start_y)**2)
-            move_time = move_distance / 2.0
-            move_steps = int(move_time / step_time)
-
-            # Move drone to first setpoint of maneuver at 2 m/s
-            for i in range(move_steps):
-                t = climb_time + move_start_time + hold_time + hold_time + i * step_time
-                ratio = i / move_steps
-                x = start_x + (maneuver_start_x  ) * ratio
-                y = start_y + (maneuver_start_y ) * ratio
-                z = -1 * initial_altitude
-                vx = move_speed * (maneuver_start_x ) / move_distance
-                vy = move_speed * (maneuver_start_y ) / move_distance
-                vz = 0.0
-                ax = 0
-                ay = 0
-                az = 0
-                yaw = 0
-                
-                mode = 50
-                row = [climb_steps + hold_steps + move_start_steps + hold_steps  + i, t, x, y, z, vx, vy, vz,0,0,0, yaw,mode, "nan", "nan", "nan"]
-                writer.writerow(row)
-
-            # Hold drone at first setpoint for 2 seconds
-            for i in range(hold_steps):
-                t = climb_time + hold_time + move_start_time + move_time + hold_time + i * step_time
-                x =  start_x + shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[0]
-                y = start_y + shape_fcn(0, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[1]
-                z = -1 * initial_altitude
-                vx = 0.0
-                vy = 0.0
-                vz = 0.0
-                ax = 0
-                ay = 0
-                az = 0
-                yaw = 0
-                mode = 60
-                row = [climb_steps + hold_steps + move_steps + move_start_steps + hold_steps  + i, t, x, y, z, vx, vy, vz, 0 ,0,0, yaw,mode, "nan", "nan", "nan"]
-                writer.writerow(row)
-
-            # Tính thời gian bắt đầu sau khi bắt đầu thao tác
-            start_time = climb_time + hold_time + move_start_time + move_time + hold_time  + hold_time
-        else:
-            # Calculate the start time after maneuver start
-            start_time = climb_time + hold_time + move_start_time + hold_time
-            move_distance=0
-            move_steps =0
-            move_time=0
-
-        # Tính tổng thời gian của quỹ đạo sau khi bắt đầu thao tác
-        total_duration = maneuver_time + start_time
-        total_steps = int(total_duration / step_time)
-        maneuver_steps = int(maneuver_time / step_time)
-
-    
-
-        # Bay theo quỹ đạo hình dạng
-        last_x, last_y, last_z = 0, 0, 0  # Initialize variables to store the last position
-
-        for step in range(maneuver_steps):
-            x, y, z, vx, vy, vz, ax, ay, az = shape_fcn(step, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)
-            x += start_x
-            y += start_y
-            yaw = 0
-            missionTime = start_time + step * step_time
-            mode = 70
-            row = [climb_steps + hold_steps + move_steps + hold_steps + move_steps + hold_steps + step, missionTime, x, y, z, vx, vy, vz, ax, ay, az, yaw, mode, "nan", "nan", "nan"]
-            writer.writerow(row)
-            last_x, last_y, last_z = x, y, z  # Update the last position
-
-           
-        # Hold drone at last maneuver setpoint for hold_time
-        for i in range(hold_steps):
-            t = start_time + maneuver_time + i * step_time
-            x, y, z = last_x, last_y, last_z  # Use the last position
-            vx = 0.0
-            vy = 0.0
-            vz = 0.0
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode = 80
-            row = [climb_steps + hold_steps + move_steps + hold_steps + move_steps + hold_steps + step + i, t, x, y, z, vx, vy, vz, ax, ay, az, yaw, mode, "nan", "nan", "nan"]
-            writer.writerow(row)
-
-        # Return to origin (0, 0, -initial_altitude)
-        return_distance = math.sqrt(last_x**2 + last_y**2 + ((-1 * initial_altitude) - last_z)**2)  # Use the last position
-        return_time = return_distance / move_speed
-        return_steps = int(return_time / step_time)
-
-        for i in range(return_steps):
-            t = start_time + maneuver_time + hold_time + i * step_time
-            ratio = i / return_steps
-            x_home = last_x * (1 - ratio)  # Use the last position
-            y_home = last_y * (1 - ratio)  # Use the last position
-            z_home = last_z + ((-1 * initial_altitude) - last_z) * ratio  # Use the last position
-            vx = - move_speed * last_x / return_distance  # Use the last position
-            vy = - move_speed * last_y / return_distance  # Use the last position
-            vz = ((-1 * initial_altitude) - last_z) / return_time  # Use the last position
-            ax = 0
-            ay = 0
-            az = 0
-            yaw = 0
-            mode = 90
-            row = [climb_steps + hold_steps + move_steps + hold_steps + move_steps + hold_steps + step + i + return_steps, t, x_home, y_home, z_home, vx, vy, vz, ax , ay , az, yaw,mode, "nan", "nan", "nan"]
-            writer.writerow(row)
-            
-            
-        print(f"Created {output_file} with the {shape_name}.")
+    # Climb to the initial altitude
+    climb_time = initial_altitude / climb_rate
+    climb_steps = int(climb_time / step_time)
+    t = np.arange(climb_steps) * step_time
+    segments.append(_segment(t, 0, 0, -climb_rate * t, 0.0, 0.0, -climb_rate, 0, 0, 0, 10))
 
+    # Hold at intial altitude
+    hold_steps = int(hold_time / step_time)
+    hold_t = np.arange(hold_steps) * step_time
+    segments.append(_segment(climb_time + hold_t, 0, 0, z_hold, 0.0, 0.0, 0.0, 0, 0, 0, 20))
 
+    # Di chuyển đến vị trí bắt đầu
+    move_start_distance = math.sqrt(start_x**2 + start_y**2)
+    move_start_time = move_start_distance / move_speed
+    move_start_steps = int(move_start_time / step_time)
+    if move_start_steps > 0:
+        ratio = np.arange(move_start_steps) / move_start_steps
+        segments.append(_segment(
+            climb_time + hold_time + np.arange(move_start_steps) * step_time,
+            start_x * ratio, start_y * ratio, z_hold,
+            move_speed * (start_x / move_start_distance), move_speed * (start_y / move_start_distance), 0.0,
+            0, 0, 0, 30))
+
+    # Hold start position for n seconds
+    segments.append(_segment(climb_time + hold_time + move_start_time + hold_t, start_x, start_y, z_hold, 0.0, 0.0, 0.0, 0, 0, 0, 40))
+
+    # Check if start position is different from first setpoint of maneuver
+    maneuver_start_x, maneuver_start_y = shape_array_fcn(np.arange(1), maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)[0, :2]
+    if 0 != maneuver_start_x or 0 != maneuver_start_y:
+        print("different Start and Manuever")
+        print(f"Origin Start: {start_x} , {start_y}")
+        print(f"Manuever Start: {maneuver_start_x} , {maneuver_start_y}")
+
+        # Calculate distance and time required to move to first setpoint of maneuver
+        move_distance = math.sqrt(maneuver_start_x**2 + maneuver_start_y**2)
+        move_time = move_distance / 2.0
+        move_steps = int(move_time / step_time)
+
+        # Move drone to first setpoint of maneuver at 2 m/s
+        if move_steps > 0:
+            ratio = np.arange(move_steps) / move_steps
+            segments.append(_segment(
+                climb_time + move_start_time + hold_time + hold_time + np.arange(move_steps) * step_time,
+                start_x + maneuver_start_x * ratio, start_y + maneuver_start_y * ratio, z_hold,
+                move_speed * maneuver_start_x / move_distance, move_speed * maneuver_start_y / move_distance, 0.0,
+                0, 0, 0, 50))
+
+        # Hold drone at first setpoint for hold_time
+        segments.append(_segment(
+            climb_time + hold_time + move_start_time + move_time + hold_time + hold_t,
+            start_x + maneuver_start_x, start_y + maneuver_start_y, z_hold, 0.0, 0.0, 0.0, 0, 0, 0, 60))
+
+        # Tính thời gian bắt đầu sau khi bắt đầu thao tác
+        start_time = climb_time + hold_time + move_start_time + move_time + hold_time + hold_time
+    else:
+        # Calculate the start time after maneuver start
+        start_time = climb_time + hold_time + move_start_time + hold_time
+
+    # Bay theo quỹ đạo hình dạng
+    maneuver_steps = int(maneuver_time / step_time)
+    steps = np.arange(maneuver_steps)
+    maneuver = shape_array_fcn(steps, maneuver_time, diameter, direction, initial_altitude, step_time, *shape_args)
+    maneuver[:, 0] += start_x
+    maneuver[:, 1] += start_y
+    segments.append(_segment(start_time + steps * step_time, *maneuver.T, 70))
+    last_x, last_y, last_z = maneuver[-1, :3] if maneuver_steps > 0 else (0, 0, 0)
+
+    # Hold drone at last maneuver setpoint for hold_time
+    segments.append(_segment(start_time + maneuver_time + hold_t, last_x, last_y, last_z, 0.0, 0.0, 0.0, 0, 0, 0, 80))
+
+    # Return to origin (0, 0, -initial_altitude)
+    return_distance = math.sqrt(last_x**2 + last_y**2 + (z_hold - last_z)**2)
+    return_time = return_distance / move_speed
+    return_steps = int(return_time / step_time)
+    if return_steps > 0:
+        ratio = np.arange(return_steps) / return_steps
+        segments.append(_segment(
+            start_time + maneuver_time + hold_time + np.arange(return_steps) * step_time,
+            last_x * (1 - ratio), last_y * (1 - ratio), last_z + (z_hold - last_z) * ratio,
+            -move_speed * last_x / return_distance, -move_speed * last_y / return_distance, (z_hold - last_z) / return_time,
+            0, 0, 0, 90))
+
+    trajectory = np.concatenate(segments)
+    trajectory[:, 0] = np.arange(len(trajectory))
+    return trajectory
+
+
+def write_active_csv(trajectory, output_file, write_binary=True):
+    """
+    Write a trajectory array built by build_active_trajectory to CSV in a single bulk write.
+
+    Args:
+        trajectory (np.ndarray): (N, 16) array with the columns of ACTIVE_CSV_HEADER.
+        output_file (str): Path of the CSV file to write.
+        write_binary (bool): Also write the memory-mappable .traj file next to the CSV.
+    """
+    df = pd.DataFrame(trajectory, columns=ACTIVE_CSV_HEADER).astype({"idx": int, "mode": int})
+    df.to_csv(output_file, index=False, na_rep="nan")
+    if write_binary:
+        write_trajectory_binary(binary_path(output_file), df)
+
+
+def create_active_csv(shape_name, diameter, direction, maneuver_time, start_x, start_y, initial_altitude, climb_rate, move_speed, hold_time, step_time, output_file="active.csv", write_binary=True):
+    """
+    Build the active trajectory for a shape and write it to output_file (and its .traj file if write_binary).
+
+    Returns:
+        np.ndarray: The trajectory that was written, so callers can use it without reading the CSV back.
+    """
+    trajectory = build_active_trajectory(shape_name, diameter, direction, maneuver_time, start_x, start_y,
+                                         initial_altitude, climb_rate, move_speed, hold_time, step_time)
+    write_active_csv(trajectory, output_file, write_binary)
+
+    print(f"Created {output_file} with the {shape_name}.")
+    return trajectory
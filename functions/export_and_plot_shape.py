@@ -2,10 +2,20 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import pandas as pd
 import numpy as np
-
-def export_and_plot_shape(output_file):
-
-    data = pd.read_csv(output_file)
+from functions.create_active_csv import ACTIVE_CSV_HEADER
+
+def export_and_plot_shape(output_file, trajectory=None):
+    """
+    Plot a trajectory coloured by flight mode and save it to shapes/trajectory_plot.png.
+
+    Args:
+        output_file (str): CSV file to read the trajectory from when trajectory is not given.
+        trajectory (np.ndarray, optional): In-memory array returned by create_active_csv; skips reading the CSV.
+    """
+    if trajectory is not None:
+        data = pd.DataFrame(trajectory, columns=ACTIVE_CSV_HEADER)
+    else:
+        data = pd.read_csv(output_file)
 
     # Extract the position coordinates and flight modes
     x = data['px']
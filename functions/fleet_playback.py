@@ -0,0 +1,145 @@
+# functions/fleet_playback.py
+
+import asyncio
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from functions.global_to_local import LocalFrame
+from functions.setpoint_sender import SetpointSender
+from functions.tick_scheduler import TickScheduler
+
+# position_offset is subtracted from every setpoint position (the drone's home in the show frame
+# when each drone flies its own CSV, (0, 0, 0) otherwise). telemetry_hub and home_position (the
+# drone's TelemetryHub and home Position) enable its deviation check.
+FleetMember = namedtuple('FleetMember', 'drone_id drone trajectory position_offset telemetry_hub home_position',
+                         defaults=(None, None))
+
+
+class FleetPlayback:
+    """
+    Plays back the trajectories of a whole fleet from a single master tick loop.
+
+    Every tick computes all drones' setpoints from their trajectories at the same clock time and
+    hands them to one SetpointSender per drone, which sends without blocking the tick. Each drone
+    has a bounded number of in-flight sends; if a drone's link is still busy, only its newest
+    setpoint is kept for sending and older unsent ones are dropped, so a slow drone cannot delay
+    the others or build a backlog.
+
+    Args:
+        members (list): FleetMember entries, one per drone.
+        step_time (float): Tick period in seconds.
+        late_policy (str): Late tick policy passed to TickScheduler.
+        max_in_flight (int): Maximum concurrent offboard sends per drone.
+        mode_descriptions (dict, optional): Mode code to description, printed on mode changes.
+        deviation_interval (int): Every this many ticks, each member with a telemetry hub compares its
+            setpoint with its latest position, as per-drone playback does.
+        show_deviations (bool): Print the deviations.
+    """
+
+    def __init__(self, members, step_time, late_policy="skip", max_in_flight=1, mode_descriptions=None,
+                 deviation_interval=100, show_deviations=False):
+        self.members = members
+        self.scheduler = TickScheduler(step_time, late_policy)
+        self.max_in_flight = max_in_flight
+        self.mode_descriptions = mode_descriptions or {}
+        self.senders = {member.drone_id: SetpointSender(member.drone.offboard, max_in_flight, f"Drone id {member.drone_id+1}")
+                        for member in members}
+        self.dispatch_times = []
+        self.fan_out_times = []
+        self.deviation_interval = deviation_interval
+        self.show_deviations = show_deviations
+        self.deviations = {member.drone_id: [] for member in members}
+        # Reference ECEF position and rotation of each home, computed once for the whole show
+        self._home_frames = {member.drone_id: LocalFrame.from_position(member.home_position)
+                             for member in members if member.home_position is not None}
+        self._last_modes = {member.drone_id: 0 for member in members}
+
+    async def _track_fan_out(self, sends, tick_start):
+        # Time from tick start until every setpoint of that tick has been sent (or replaced by a newer one)
+        await asyncio.gather(*sends)
+        self.fan_out_times.append(time.monotonic() - tick_start)
+
+    def _check_deviation(self, member, position):
+        # Difference between the setpoint and the latest position of the drone, in local NED
+        latest = member.telemetry_hub.latest("position")
+        if latest is None:
+            return
+        local_ned_position = self._home_frames[member.drone_id].position_to_ned(latest)
+        deviation = [(a - b) for a, b in zip(position, local_ned_position)]
+        self.deviations[member.drone_id].append(float(np.linalg.norm(deviation)))
+        if self.show_deviations:
+            print(f"Drone {member.drone_id+1} Deviations: {round(deviation[0], 1)} {round(deviation[1], 1)} {round(deviation[2], 1)}")
+
+    def _report_mode(self, member, mode_code):
+        if self._last_modes[member.drone_id] != mode_code:
+            print(f"Drone id: {member.drone_id+1}: Mode number: {mode_code}, Description: {self.mode_descriptions.get(mode_code, '')}")
+            self._last_modes[member.drone_id] = mode_code
+
+    async def run(self):
+        """
+        Run the fleet until the longest trajectory has finished.
+        """
+        duration = max(member.trajectory.duration for member in self.members)
+        trackers = []
+
+        async for tick in self.scheduler.ticks(duration):
+            tick_start = time.monotonic()
+            sends = []
+            positions = []
+            for member in self.members:
+                setpoint = member.trajectory.setpoint_at(tick.t)
+                self._report_mode(member, setpoint[-1])
+                position = [a - b for a, b in zip(setpoint[1:4], member.position_offset)]
+                sends.append(self.senders[member.drone_id].submit(position, setpoint[4:7], setpoint[7:10], setpoint[10]))
+                positions.append(position)
+
+            self.dispatch_times.append(time.monotonic() - tick_start)
+            trackers.append(asyncio.ensure_future(self._track_fan_out(sends, tick_start)))
+            trackers = [tracker for tracker in trackers if not tracker.done()]
+
+            # Safety monitoring of every drone, after the setpoints are on their way
+            if tick.index % self.deviation_interval == 0:
+                for member, position in zip(self.members, positions):
+                    if member.drone_id in self._home_frames:
+                        self._check_deviation(member, position)
+
+        for sender in self.senders.values():
+            await sender.drain()
+        await asyncio.gather(*trackers)
+
+    def summary(self, percentiles=(50, 90, 99, 100)):
+        """
+        Summary of tick lateness, dispatch time, fan-out time, round-trip time, dropped setpoints and
+        largest deviation for logging.
+        """
+        def format_ms(values):
+            if not values:
+                return "n/a"
+            stats = np.percentile(np.asarray(values) * 1000, percentiles)
+            return ", ".join(f"p{p}={v:.1f}ms" for p, v in zip(percentiles, stats))
+
+        round_trips = [rtt for sender in self.senders.values() for rtt in sender.round_trips]
+        dropped = sum(sender.replaced for sender in self.senders.values())
+        deviations = [deviation for values in self.deviations.values() for deviation in values]
+        largest = f"{max(deviations):.1f} m" if deviations else "n/a"
+        return (f"{self.scheduler.summary()}; dispatch {format_ms(self.dispatch_times)}; "
+                f"fan-out {format_ms(self.fan_out_times)}; round-trip {format_ms(round_trips)}; {dropped} setpoints dropped; "
+                f"largest deviation {largest}")
+
+
+async def perform_fleet_trajectory(members, step_time, late_policy="skip", max_in_flight=1, mode_descriptions=None,
+                                   show_deviations=False):
+    """
+    Fly all members' trajectories from one shared clock and print the timing summary.
+
+    Returns:
+        FleetPlayback: The finished playback, for inspecting its statistics.
+    """
+    print(f"-- Performing fleet trajectory with {len(members)} drones")
+    playback = FleetPlayback(members, step_time, late_policy, max_in_flight, mode_descriptions,
+                             show_deviations=show_deviations)
+    await playback.run()
+    print(f"-- Fleet shape completed: {playback.summary()}")
+    return playback
@@ -1,13 +1,169 @@
-import navpy
+import math
+
+import numpy as np
 from mavsdk.offboard import PositionNedYaw
 
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+
+
+def lla_to_ecef(lla):
+    """
+    Convert (latitude_deg, longitude_deg, altitude_m) rows to earth-centred earth-fixed coordinates.
+
+    Args:
+        lla (np.ndarray): (..., 3) geodetic positions, altitude above the WGS84 ellipsoid.
+
+    Returns:
+        np.ndarray: (..., 3) ECEF positions in metres.
+    """
+    lla = np.asarray(lla, dtype=float)
+    lat = np.radians(lla[..., 0])
+    lon = np.radians(lla[..., 1])
+    alt = lla[..., 2]
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    return np.stack(((n + alt) * cos_lat * np.cos(lon),
+                     (n + alt) * cos_lat * np.sin(lon),
+                     (n * (1 - WGS84_E2) + alt) * sin_lat), axis=-1)
+
+
+def ecef_to_lla(ecef):
+    """
+    Convert ECEF rows back to (latitude_deg, longitude_deg, altitude_m), in closed form (Heikkinen).
+
+    Args:
+        ecef (np.ndarray): (..., 3) ECEF positions in metres, away from the Earth's centre.
+
+    Returns:
+        np.ndarray: (..., 3) geodetic positions.
+    """
+    ecef = np.asarray(ecef, dtype=float)
+    x, y, z = ecef[..., 0], ecef[..., 1], ecef[..., 2]
+    a2, b2 = WGS84_A ** 2, WGS84_B ** 2
+    p2 = x ** 2 + y ** 2
+    p = np.sqrt(p2)
+    z2 = z ** 2
+
+    f = 54 * b2 * z2
+    g = p2 + (1 - WGS84_E2) * z2 - WGS84_E2 * (a2 - b2)
+    c = WGS84_E2 ** 2 * f * p2 / g ** 3
+    s = np.cbrt(1 + c + np.sqrt(c ** 2 + 2 * c))
+    k = s + 1 + 1 / s
+    big_p = f / (3 * k ** 2 * g ** 2)
+    q = np.sqrt(1 + 2 * WGS84_E2 ** 2 * big_p)
+    r0 = (-big_p * WGS84_E2 * p / (1 + q)
+          + np.sqrt(a2 / 2 * (1 + 1 / q) - big_p * (1 - WGS84_E2) * z2 / (q * (1 + q)) - big_p * p2 / 2))
+    u = np.sqrt((p - WGS84_E2 * r0) ** 2 + z2)
+    v = np.sqrt((p - WGS84_E2 * r0) ** 2 + (1 - WGS84_E2) * z2)
+    z0 = b2 * z / (WGS84_A * v)
+
+    return np.stack((np.degrees(np.arctan2(z + WGS84_EP2 * z0, p)),
+                     np.degrees(np.arctan2(y, x)),
+                     u * (1 - b2 / (WGS84_A * v))), axis=-1)
+
+
+class LocalFrame:
+    """
+    North-east-down frame at a fixed geodetic reference, usually a drone's home position.
+
+    The ECEF position of the reference and the ECEF-to-NED rotation are computed once, so a
+    conversion is one ECEF conversion and a 3x3 rotation. to_ned is the per-sample scalar path
+    (math only, no arrays); the *_array methods convert N x 3 arrays at once. Results match
+    navpy.lla2ned / navpy.ned2lla with the WGS84 model.
+
+    Args:
+        latitude_deg (float): Reference latitude.
+        longitude_deg (float): Reference longitude.
+        altitude_m (float): Reference altitude above the WGS84 ellipsoid (e.g. absolute_altitude_m).
+    """
+
+    def __init__(self, latitude_deg, longitude_deg, altitude_m):
+        self.reference = (float(latitude_deg), float(longitude_deg), float(altitude_m))
+        self._origin = lla_to_ecef(self.reference)
+        lat = math.radians(latitude_deg)
+        lon = math.radians(longitude_deg)
+        sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+        sin_lon, cos_lon = math.sin(lon), math.cos(lon)
+        self._rotation = np.array([
+            [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+            [-sin_lon, cos_lon, 0.0],
+            [-cos_lat * cos_lon, -cos_lat * sin_lon, -sin_lat],
+        ])
+        # Plain floats for the scalar path
+        self._x0, self._y0, self._z0 = self._origin.tolist()
+        self._r = self._rotation.ravel().tolist()
+
+    @classmethod
+    def from_position(cls, position):
+        """
+        Build the frame of a mavsdk telemetry Position (e.g. the home position).
+        """
+        return cls(position.latitude_deg, position.longitude_deg, position.absolute_altitude_m)
+
+    def to_ned(self, latitude_deg, longitude_deg, altitude_m):
+        """
+        Convert one geodetic position to (north, east, down) metres.
+        """
+        lat = math.radians(latitude_deg)
+        lon = math.radians(longitude_deg)
+        sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+        n = WGS84_A / math.sqrt(1 - WGS84_E2 * sin_lat * sin_lat)
+        dx = (n + altitude_m) * cos_lat * math.cos(lon) - self._x0
+        dy = (n + altitude_m) * cos_lat * math.sin(lon) - self._y0
+        dz = (n * (1 - WGS84_E2) + altitude_m) * sin_lat - self._z0
+        r = self._r
+        return (r[0] * dx + r[1] * dy + r[2] * dz,
+                r[3] * dx + r[4] * dy,
+                r[6] * dx + r[7] * dy + r[8] * dz)
+
+    def position_to_ned(self, position):
+        """
+        Convert a mavsdk telemetry Position to (north, east, down) metres.
+        """
+        return self.to_ned(position.latitude_deg, position.longitude_deg, position.absolute_altitude_m)
+
+    def to_ned_array(self, lla):
+        """
+        Convert (N, 3) (latitude_deg, longitude_deg, altitude_m) rows to (N, 3) NED rows.
+        """
+        return (lla_to_ecef(lla) - self._origin) @ self._rotation.T
+
+    def to_global(self, north, east, down):
+        """
+        Convert one (north, east, down) position to (latitude_deg, longitude_deg, altitude_m).
+        """
+        return tuple(self.to_global_array(np.array([north, east, down]))[0].tolist())
+
+    def to_global_array(self, ned):
+        """
+        Convert (N, 3) NED rows to (N, 3) (latitude_deg, longitude_deg, altitude_m) rows.
+        """
+        ned = np.asarray(ned, dtype=float).reshape(-1, 3)
+        return ecef_to_lla(ned @ self._rotation + self._origin)
+
+
+_frames = {}
+
+
+def local_frame(home_position):
+    """
+    Return the LocalFrame of a home position, built once per distinct reference.
+    """
+    key = (home_position.latitude_deg, home_position.longitude_deg, home_position.absolute_altitude_m)
+    if key not in _frames:
+        _frames[key] = LocalFrame(*key)
+    return _frames[key]
+
+
 def global_to_local(global_position, home_position):
     # Chuyển đổi vĩ độ và kinh độ sang hệ tọa độ cục bộ
-    lla_ref = [home_position.latitude_deg, home_position.longitude_deg, home_position.absolute_altitude_m]
-    lla = [global_position.latitude_deg, global_position.longitude_deg, global_position.absolute_altitude_m]
-
-    ned = navpy.lla2ned(lla[0], lla[1], lla[2],
-                        lla_ref[0], lla_ref[1], lla_ref[2])
+    ned = local_frame(home_position).position_to_ned(global_position)
 
     # Return the local position
-    return PositionNedYaw(ned[0], ned[1], ned[2], 0.0)
\ No newline at end of file
+    return PositionNedYaw(ned[0], ned[1], ned[2], 0.0)
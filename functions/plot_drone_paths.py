@@ -1,93 +1,174 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.legend_handler import HandlerTuple
+from matplotlib.lines import Line2D
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import numpy as np
-from matplotlib.legend_handler import HandlerTuple
 
+from functions.show_store import ShowStore, show_path, store_is_current
+
+
+def decimate(points, max_points):
+    """
+    Keep at most max_points evenly strided rows of points, always including the last one.
+    """
+    if max_points is None or len(points) <= max_points:
+        return points
+    stride = int(np.ceil(len(points) / max_points))
+    return np.concatenate((points[:-1:stride], points[-1:]))
+
+
+def _legend(ax, color):
+    # Proxy artists, so the legend does not depend on which paths were drawn
+    raw = (Line2D([], [], color=color, alpha=0.2), Line2D([], [], color=color, marker='o', linestyle=''))
+    smoothed = (Line2D([], [], color=color), Line2D([], [], color=color, marker='.', linestyle='', alpha=0.2))
+    ax.legend([raw, smoothed], ['Raw setpoints', 'Smoothed path'], handler_map={tuple: HandlerTuple(ndivide=None)})
+
+
+def render_drone_plot(name, raw, processed, color, output_file, max_points=2000):
+    """
+    Render the figure of one drone to a PNG file without a display.
+
+    This is the unit of work of plot_drone_paths; it only uses an Agg canvas, so it can run in a worker process.
+
+    Args:
+        name (str): Drone name used in the title.
+        raw (np.ndarray): (n, 3) Skybrush setpoints (x, y, height).
+        processed (np.ndarray, optional): (m, 3) processed path (x, y, height).
+        color: Matplotlib colour of the drone.
+        output_file (str): PNG path.
+        max_points (int): Maximum points drawn per path.
+
+    Returns:
+        str: output_file
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+
+    # Plot the SkyBrush drone path as a line and points
+    raw = decimate(raw, max_points)
+    ax.plot(raw[:, 0], raw[:, 1], raw[:, 2], color=color, alpha=0.2)
+    ax.scatter(raw[:, 0], raw[:, 1], raw[:, 2], color=color, s=20)
+
+    if processed is not None:
+        processed = decimate(processed, max_points)
+        ax.plot(processed[:, 0], processed[:, 1], processed[:, 2], color=color)
+        ax.scatter(processed[:, 0], processed[:, 1], processed[:, 2], color=color, s=5, alpha=0.2)
+
+    # Đặt tiêu đề và nhãn trục
+    ax.set_title('Drone Paths for ' + name)
+    ax.set_xlabel('North (m)')
+    ax.set_ylabel('East (m)')
+    ax.set_zlabel('Height (m)')
+    _legend(ax, color)
+
+    # Lưu biểu đồ thành ảnh
+    fig.savefig(output_file)
+    return output_file
+
+
+def plot_drone_paths(skybrush_dir, processed_dir, show_plots=True, only=None, store=None, workers=1, max_points=2000, plots_dir='shapes/swarm/plots'):
+    """
+    Plot the raw and processed path of every drone, one figure per drone plus one for all drones.
+
+    The per-drone figures are rendered off-screen (Agg) and saved as PNG files, in a process pool
+    when workers is not 1. Every path is decimated to at most max_points points for display. The
+    all-drones figure draws all paths as two line collections instead of one plot call per drone.
+
+    Args:
+        skybrush_dir (str): Directory with the Skybrush CSV files.
+        processed_dir (str): Directory with the processed CSV files.
+        show_plots (bool): Show the all-drones figure after saving it. The per-drone figures are only saved.
+        only (iterable, optional): Drone file names whose own figure is redrawn. The all-drones
+            figure is redrawn whenever at least one drone is. Defaults to all drones.
+        store (ShowStore, optional): Processed paths of every drone. Defaults to the show store saved in
+            processed_dir, or one built from the processed files if there is none or it is stale.
+        workers (int): Worker processes for the per-drone figures; None uses every CPU core, 1 renders serially.
+        max_points (int): Maximum points drawn per path; None draws every sample.
+        plots_dir (str): Directory of the PNG files.
+    """
+    if only is not None and len(only) == 0:
+        print("Drone paths unchanged, plots not redrawn")
+        return
+
+    start = time.perf_counter()
 
-def plot_drone_paths(skybrush_dir, processed_dir, show_plots=True):
     # Nhận danh sách tất cả các tệp CSV của drone trong các thư mục được chỉ định
-    skybrush_files = [f for f in os.listdir(skybrush_dir) if f.endswith('.csv')]
-    processed_files = [f for f in os.listdir(processed_dir) if f.endswith('.csv')]
-
-    # Tạo bản đồ màu
-    colormap = plt.cm.get_cmap('tab10')
-
-    # Create color_dict to save colors assigned to each file
-    color_dict = {file: colormap(i % 10) for i, file in enumerate(skybrush_files)}
+    skybrush_files = sorted(f for f in os.listdir(skybrush_dir) if f.endswith('.csv'))
 
-    # Loop through the drone files and plot each one
-    for i, file in enumerate(skybrush_files):
-        # Create a 3D figure and axis object for each drone
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
+    # Processed paths come from the show store, loaded once for all drones
+    if store is None:
+        if store_is_current(processed_dir):
+            store = ShowStore.load(show_path(processed_dir))
+        else:
+            store = ShowStore.from_processed(processed_dir)
+    processed_files = [f"Drone {drone_id}.csv" for drone_id in store.drone_ids]
 
-        # Tải dữ liệu từ tệp CSV SkyBrush
-        skybrush_data = pd.read_csv(os.path.join(skybrush_dir, file))
+    # Raw Skybrush setpoints, read once per file; heights are already up
+    raw_paths = {file: pd.read_csv(os.path.join(skybrush_dir, file), usecols=['x [m]', 'y [m]', 'z [m]']).to_numpy()
+                 for file in skybrush_files}
 
-        # Lấy màu từ bản đồ màu bằng color_dict
-        color = color_dict[file]
+    def processed_path_of(file):
+        # Processed files are north-east-down, convert Z to height
+        i = store.index_of(file.replace('Drone', '').replace('.csv', ''))
+        return store.positions[i, :store.lengths[i]] * np.array([1, 1, -1], dtype=np.float32)
 
-        # Plot the SkyBrush drone path as a line and points, convert Z to height
-        skybrush_path, = ax.plot(skybrush_data['x [m]'], skybrush_data['y [m]'], skybrush_data['z [m]'], color=color,
-                                 alpha=0.2)
-        skybrush_points = ax.scatter(skybrush_data['x [m]'], skybrush_data['y [m]'], skybrush_data['z [m]'],
-                                     color=color, s=20)
-
-        # Check if corresponding processed file exists
-        if file in processed_files:
-            # Load the data from the processed CSV file
-            processed_data = pd.read_csv(os.path.join(processed_dir, file))
-
-            # Plot the processed drone path as a line and points, convert Z to height
-            processed_path, = ax.plot(processed_data['px'], processed_data['py'], processed_data['pz'], color=color)
-            processed_points = ax.scatter(processed_data['px'], processed_data['py'], processed_data['pz'], color=color,
-                                          s=5, alpha=0.2)
-
-        # Đặt tiêu đề (không có .csv) và nhãn trục
-        ax.set_title('Drone Paths for ' + file.replace('.csv', ''))
-        ax.set_xlabel('North (m)')
-        ax.set_ylabel('East (m)')
-        ax.set_zlabel('Height (m)')
-
-        # Thêm chú thích
-        ax.legend([(skybrush_points, skybrush_path), (processed_points, processed_path)],
-                  ['Raw setpoints', 'Smoothed path'],
-                  handler_map={tuple: HandlerTuple(ndivide=None)})
+    # Tạo bản đồ màu
+    colormap = matplotlib.colormaps['tab10']
 
-        # Lưu biểu đồ thành ảnh
-        plt.savefig('shapes/swarm/plots/' + file.split('.')[0] + '.png')
+    # Create color_dict to save colors assigned to each file
+    color_dict = {file: colormap(i % 10) for i, file in enumerate(skybrush_files)}
 
-        # Hiển thị biểu đồ
-        if show_plots:
-            plt.show()
+    # One figure per drone
+    jobs = []
+    for file in skybrush_files:
+        if only is not None and file not in only:
+            continue
+        processed = processed_path_of(file) if file in processed_files else None
+        jobs.append((file.replace('.csv', ''), raw_paths[file], processed, color_dict[file],
+                     os.path.join(plots_dir, file.split('.')[0] + '.png'), max_points))
+
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            render_drone_plot(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(render_drone_plot, *zip(*jobs)))
 
     # Create a 3D figure and axis object for all drones plot
-    fig_all = plt.figure()
+    fig_all = plt.figure() if show_plots else Figure()
+    if not show_plots:
+        FigureCanvasAgg(fig_all)
     ax_all = fig_all.add_subplot(111, projection='3d')
 
-    # Loop through all the files again to plot all drones on the same plot
-    for file in skybrush_files + processed_files:
-        # Load the data from the CSV file
-        data = pd.read_csv(os.path.join(skybrush_dir if file in skybrush_files else processed_dir, file))
-
-        # Get a color from the colormap using color_dict
-        color = color_dict[
-            file] if file in skybrush_files else 'blue'  # for processed_files which were not in skybrush_files, use default color 'blue'
-
-        # Plot the drone path as a simple line and points, convert Z to height
-        path, = ax_all.plot(data['x [m]' if file in skybrush_files else 'px'],
-                            data['y [m]' if file in skybrush_files else 'py'],
-                            data['z [m]' if file in skybrush_files else 'pz'],
-                            color=color,
-                            alpha=0.2 if file in skybrush_files else 1.0)
-        points = ax_all.scatter(data['x [m]' if file in skybrush_files else 'px'],
-                                data['y [m]' if file in skybrush_files else 'py'],
-                                data['z [m]' if file in skybrush_files else 'pz'],
-                                color=color,
-                                s=20 if file in skybrush_files else 5,
-                                alpha=0.5)
+    # All raw paths in one collection and one scatter, all processed paths in another collection
+    raw_segments = [decimate(raw_paths[file], max_points) for file in skybrush_files]
+    raw_colors = [color_dict[file] for file in skybrush_files]
+    processed_segments = [decimate(processed_path_of(file), max_points) for file in processed_files]
+    processed_colors = [color_dict.get(file, 'blue') for file in processed_files]  # drones without a Skybrush file are blue
+
+    if raw_segments:
+        ax_all.add_collection3d(Line3DCollection(raw_segments, colors=raw_colors, alpha=0.2))
+        raw_points = np.concatenate(raw_segments)
+        ax_all.scatter(raw_points[:, 0], raw_points[:, 1], raw_points[:, 2],
+                       color=np.repeat(raw_colors, [len(segment) for segment in raw_segments], axis=0), s=20, alpha=0.5)
+    if processed_segments:
+        ax_all.add_collection3d(Line3DCollection(processed_segments, colors=processed_colors))
+
+    # Collections do not update the axis limits
+    all_points = np.concatenate(raw_segments + processed_segments) if raw_segments or processed_segments else np.zeros((1, 3))
+    ax_all.set_xlim(all_points[:, 0].min(), all_points[:, 0].max())
+    ax_all.set_ylim(all_points[:, 1].min(), all_points[:, 1].max())
+    ax_all.set_zlim(all_points[:, 2].min(), all_points[:, 2].max())
 
     # Set the title and axis labels
     ax_all.set_title('Drone Paths for All Drones')
@@ -96,12 +177,11 @@ def plot_drone_paths(skybrush_dir, processed_dir, show_plots=True):
     ax_all.set_zlabel('Height (m)')
 
     # Add a legend
-    ax_all.legend([(skybrush_points, skybrush_path), (processed_points, processed_path)],
-                  ['Raw setpoints', 'Smoothed path'],
-                  handler_map={tuple: HandlerTuple(ndivide=None)})
+    _legend(ax_all, 'gray')
 
     # Save the plot as an image
-    plt.savefig('shapes/swarm/plots/all_drones.png')
+    fig_all.savefig(os.path.join(plots_dir, 'all_drones.png'))
+    print(f"Plotted {len(jobs)} drones in {time.perf_counter() - start:.2f} s")
 
     # Show the plot
     if show_plots:
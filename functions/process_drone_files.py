@@ -2,22 +2,307 @@
 
 import pandas as pd
 import numpy as np
-from scipy.interpolate import CubicSpline, Akima1DInterpolator
+from scipy.interpolate import CubicSpline, Akima1DInterpolator, PchipInterpolator, PPoly
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 
+from functions.build_manifest import file_hash
+from functions.show_manifest import drone_entry, merge_drone_entries
+from functions.spline_trajectory import save_spline, spline_path
+from functions.trajectory_binary import binary_path, to_structured, write_trajectory_binary
+from functions.trajectory_simplify import simplified_path
 
-def process_drone_files(skybrush_dir, processed_dir, method='cubic', dt=0.05):
+# Keyframes on each side of a streaming window that the local interpolators look at
+STREAM_MARGIN = 3
+
+
+def _samples_frame(first_idx, t_new, pos_new, vel_new, acc_new, led_new):
+    # Processed trajectory rows, numbered from first_idx
+    data = {
+        'idx': np.arange(first_idx, first_idx + len(t_new)),
+        't': t_new,
+        'px': pos_new[:, 0],
+        'py': pos_new[:, 1],
+        'pz': pos_new[:, 2],
+        'vx': vel_new[:, 0],
+        'vy': vel_new[:, 1],
+        'vz': vel_new[:, 2],
+        'ax': acc_new[:, 0],
+        'ay': acc_new[:, 1],
+        'az': acc_new[:, 2],
+        'yaw': 0,  # placeholder
+        'mode': 70,  # placeholder
+        'ledr': led_new[:, 0],
+        'ledg': led_new[:, 1],
+        'ledb': led_new[:, 2],
+    }
+    return pd.DataFrame(data)
+
+
+def output_paths(new_filepath, output='samples', write_binary=True):
+    """
+    Return the files processing writes for one drone: the CSV and .traj files for samples, the spline file for splines.
+    """
+    paths = []
+    if output in ('samples', 'both'):
+        paths.append(new_filepath)
+        if write_binary:
+            paths.append(binary_path(new_filepath))
+    if output in ('spline', 'both'):
+        paths.append(spline_path(new_filepath))
+    return paths
+
+
+def remove_outputs(new_filepath, keep=()):
+    """
+    Delete the processed outputs of one drone (CSV, .traj, spline and simplified file) except the paths in keep.
+
+    Outputs of an earlier run with other settings would otherwise still be found and played back.
+    """
+    for path in (new_filepath, binary_path(new_filepath), spline_path(new_filepath), simplified_path(new_filepath)):
+        if path not in keep and os.path.exists(path):
+            os.remove(path)
+
+
+def processed_files(processed_dir):
+    """
+    Return the 'Drone N.csv' names of the drones that have any processed output in processed_dir.
+    """
+    names = set()
+    for filename in os.listdir(processed_dir):
+        match = re.match(r"(Drone \d+)\.", filename)
+        if match:
+            names.add(match.group(1) + ".csv")
+    return sorted(names)
+
+
+def process_drone_file(filepath, processed_dir, method='cubic', dt=0.05, write_binary=True, output='samples', keyframes=None):
+    """
+    Process a single Skybrush drone file into processed_dir.
+
+    This is the unit of work of process_drone_files; it is a module-level function so it can be
+    sent to a worker process. Errors are caught and reported in the result instead of raised.
+
+    Args:
+    filepath (str): Đường dẫn của tập tin drone sẽ được xử lý.
+    processed_dir, method, dt, write_binary, output: Xem process_drone_files.
+    keyframes (pd.DataFrame, optional): Keyframes in the Skybrush CSV layout (e.g. imported from a .skyc
+              show) to process instead of reading filepath; filepath then only names the output.
+
+    Returns:
+    dict: filename, ok (bool), error (str or None), seconds (processing time), output path and
+          manifest (the show manifest entry of the drone, None on error).
+    """
+    filename = os.path.basename(filepath)
+    start = time.perf_counter()
+    new_filepath = os.path.join(processed_dir, filename)
+
+    try:
+        # Outputs this run does not rewrite are stale
+        remove_outputs(new_filepath, keep=output_paths(new_filepath, output, write_binary))
+
+        # Load csv data
+        df = pd.read_csv(filepath) if keyframes is None else keyframes.copy()
+
+        # Resample to 0.05 seconds (20Hz) using cubic spline interpolation
+        x = df['Time [msec]'] / 1000  # convert msec to sec
+
+        # Multiply z-axis values by -1
+        df['z [m]'] = df['z [m]'] * -1
+
+        # Chọn phương pháp nội suy
+        if method == 'cubic':
+            Interpolator = CubicSpline
+        elif method == 'akima':
+            Interpolator = Akima1DInterpolator
+        elif method == 'pchip':
+            Interpolator = PchipInterpolator
+        else:
+            print(f"Phương pháp nội suy không xác định: {method}. Sử dụng 'cubic' làm mặc định.")
+            Interpolator = CubicSpline
+
+        cs_pos = Interpolator(x, df[['x [m]', 'y [m]', 'z [m]']])
+        cs_led = Interpolator(x, df[['Red', 'Green', 'Blue']])
+
+        # Tạo dấu thời gian và dữ liệu mới
+        t_new = np.arange(0, x.iloc[-1], dt)
+        pos_new = cs_pos(t_new)
+
+        # Tính vận tốc và gia tốc
+        vel_new = cs_pos.derivative()(t_new)
+        acc_new = cs_pos.derivative().derivative()(t_new)
+
+        if output in ('samples', 'both'):
+            led_new = cs_led(t_new)
+
+            # Chuẩn bị khung dữ liệu cho dữ liệu mới
+            df_new = _samples_frame(0, t_new, pos_new, vel_new, acc_new, led_new)
+
+            # Lưu vào thư mục đã xử lý
+            df_new.to_csv(new_filepath, index=False)
+            if write_binary:
+                write_trajectory_binary(binary_path(new_filepath), df_new)
+
+        # Written after the CSV file, so a spline file older than the CSV file is known to be stale
+        if output in ('spline', 'both'):
+            save_spline(spline_path(new_filepath), cs_pos, cs_led)
+
+        checksum = file_hash(new_filepath if output in ('samples', 'both') else spline_path(new_filepath))
+        manifest = drone_entry(t_new, pos_new, vel_new, acc_new, checksum)
+        error = None
+    except Exception as e:
+        manifest = None
+        error = str(e)
+
+    return {
+        'filename': filename,
+        'ok': error is None,
+        'error': error,
+        'seconds': time.perf_counter() - start,
+        'output': new_filepath,
+        'manifest': manifest,
+    }
+
+
+def process_drone_file_streaming(filepath, processed_dir, method='akima', dt=0.05, write_binary=True, output='samples', chunk_rows=10000):
+    """
+    Process a single Skybrush drone file in chunks, for shows too long to load and fit at once.
+
+    The file is read chunk_rows keyframes at a time. Each window of keyframes gets its own local
+    interpolator (Akima or PCHIP), and only the intervals at least STREAM_MARGIN keyframes away from
+    the window edges are resampled and written; consecutive windows overlap by those margins.
+    Local interpolators only look at their neighbouring keyframes, so the output is the same as
+    fitting the same method to the whole file, while memory stays bounded by the chunk size.
+    A global cubic spline is not local, so method='cubic' uses Akima here.
+
+    Args:
+        filepath (str): Đường dẫn của tập tin drone sẽ được xử lý.
+        method (str): 'akima' or 'pchip'. Mặc định là 'akima'.
+        chunk_rows (int): Keyframes read per chunk.
+        processed_dir, dt, write_binary, output: Xem process_drone_files. The .traj file and the
+            spline coefficients are collected in memory, which is much smaller than the CSV data.
+
+    Returns:
+    dict: Như process_drone_file.
+    """
+    filename = os.path.basename(filepath)
+    start = time.perf_counter()
+    new_filepath = os.path.join(processed_dir, filename)
+
+    try:
+        if method == 'pchip':
+            Interpolator = PchipInterpolator
+        else:
+            if method != 'akima':
+                print(f"Phương pháp nội suy không hỗ trợ khi xử lý theo khối: {method}. Sử dụng 'akima'.")
+            Interpolator = Akima1DInterpolator
+
+        # Outputs this run does not rewrite are stale
+        remove_outputs(new_filepath, keep=output_paths(new_filepath, output, write_binary))
+
+        write_samples = output in ('samples', 'both')
+        write_coefficients = output in ('spline', 'both')
+        columns = ['Time [msec]', 'x [m]', 'y [m]', 'z [m]', 'Red', 'Green', 'Blue']
+
+        window = np.empty((0, len(columns)))
+        first_sample = 0
+        binary_parts = []
+        breakpoints = []
+        pos_coefficients = []
+        led_coefficients = []
+        manifest = None
+        chunks = pd.read_csv(filepath, usecols=columns, chunksize=chunk_rows)
+
+        def emit(window, first, last, last_sample):
+            # Resample the intervals first..last - 1 of the window; samples last_sample onwards belong to the next window
+            nonlocal first_sample, manifest
+            x = window[:, 0] / 1000  # convert msec to sec
+            cs_pos = Interpolator(x, window[:, 1:4] * [1, 1, -1])  # z-axis values multiplied by -1
+            cs_led = Interpolator(x, window[:, 4:7])
+
+            if write_coefficients:
+                breakpoints.append(x[first:last])
+                pos_coefficients.append(cs_pos.c[:, first:last])
+                led_coefficients.append(cs_led.c[:, first:last])
+
+            t_new = np.arange(first_sample, last_sample) * dt
+            if len(t_new) == 0:
+                return
+            pos_new = cs_pos(t_new)
+            vel_new = cs_pos.derivative()(t_new)
+            acc_new = cs_pos.derivative().derivative()(t_new)
+            entry = drone_entry(t_new, pos_new, vel_new, acc_new)
+            manifest = entry if manifest is None else merge_drone_entries(manifest, entry)
+
+            if write_samples:
+                df_new = _samples_frame(first_sample, t_new, pos_new, vel_new, acc_new, cs_led(t_new))
+                df_new.to_csv(new_filepath, index=False, mode='w' if first_sample == 0 else 'a', header=first_sample == 0)
+                if write_binary:
+                    binary_parts.append(to_structured(df_new))
+            first_sample = last_sample
+
+        first = 0
+        for chunk in chunks:
+            window = np.concatenate((window, chunk.to_numpy(dtype=float)))
+            if len(window) <= 2 * STREAM_MARGIN + 1:
+                continue
+            # Intervals up to STREAM_MARGIN keyframes before the end of the window are final
+            last = len(window) - 1 - STREAM_MARGIN
+            emit(window, first, last, int(np.ceil(window[last, 0] / 1000 / dt)))
+            window = window[last - STREAM_MARGIN:]
+            first = STREAM_MARGIN
+
+        # The end of the file is a real edge, so every remaining interval is final
+        last = len(window) - 1
+        emit(window, first, last, int(np.ceil(window[last, 0] / 1000 / dt)))
+
+        if write_coefficients:
+            breakpoints.append(window[-1:, 0] / 1000)
+            save_spline(spline_path(new_filepath),
+                        PPoly(np.concatenate(pos_coefficients, axis=1), np.concatenate(breakpoints)),
+                        PPoly(np.concatenate(led_coefficients, axis=1), np.concatenate(breakpoints)))
+        if write_samples and write_binary:
+            write_trajectory_binary(binary_path(new_filepath), np.concatenate(binary_parts))
+
+        manifest['sha256'] = file_hash(new_filepath if write_samples else spline_path(new_filepath))
+        error = None
+    except Exception as e:
+        manifest = None
+        error = str(e)
+
+    return {
+        'filename': filename,
+        'ok': error is None,
+        'error': error,
+        'seconds': time.perf_counter() - start,
+        'output': new_filepath,
+        'manifest': manifest,
+    }
+
+
+def process_drone_files(skybrush_dir, processed_dir, method='cubic', dt=0.05, write_binary=True, output='samples', workers=1, only=None, streaming=False, chunk_rows=10000):
     """
     Function to process drone files from a specified directory and output to another directory.
 
     Args:
     skybrush_dir (str): Thư mục chứa các tập tin drone sẽ được xử lý.
     processed_dir (str): Thư mục nơi các tập tin được xử lý sẽ được xuất ra
-    method (str): Phương pháp nội suy được sử dụng. Các tùy chọn là 'cubic' và 'akima'. Mặc định là 'cubic'.
+    method (str): Phương pháp nội suy được sử dụng. Các tùy chọn là 'cubic', 'akima' và 'pchip'. Mặc định là 'cubic'.
     dt (float): Bước thời gian lấy mẫu lại. Mặc định là 0,05.
+    write_binary (bool): Also write the memory-mappable .traj file next to each processed CSV.
+    output (str): 'samples' writes the resampled CSV, 'spline' writes only the spline coefficients
+                  (Drone N.spline.npz) for SplineTrajectory, 'both' writes both. Mặc định là 'samples'.
+    workers (int): Number of worker processes. 1 processes the files serially in this process,
+                   None uses one worker per CPU core. Mặc định là 1.
+    only (iterable, optional): File names to process; the other files are left untouched. Mặc định là tất cả.
+    streaming (bool): Process each file in chunks of chunk_rows keyframes with local interpolation windows
+                      (see process_drone_file_streaming), for very long shows. Mặc định là False.
+    chunk_rows (int): Keyframes per chunk when streaming.
 
     Returns:
-    None
+    list: One result dict per file (see process_drone_file), or None if a directory is missing.
     """
     # Check if directories exist
     if not os.path.exists(skybrush_dir):
@@ -29,68 +314,44 @@ def process_drone_files(skybrush_dir, processed_dir, method='cubic', dt=0.05):
         return
 
     # Process all csv files in the skybrush directory
-    for filename in os.listdir(skybrush_dir):
-        if filename.endswith(".csv"):
-
-            try:
-                # Load csv data
-                filepath = os.path.join(skybrush_dir, filename)
-                df = pd.read_csv(filepath)
-
-                # Resample to 0.05 seconds (20Hz) using cubic spline interpolation
-                x = df['Time [msec]'] / 1000  # convert msec to sec
-
-                # Multiply z-axis values by -1
-                df['z [m]'] = df['z [m]'] * -1
-
-                # Chọn phương pháp nội suy
-                if method == 'cubic':
-                    Interpolator = CubicSpline
-                elif method == 'akima':
-                    Interpolator = Akima1DInterpolator
-                else:
-                    print(f"Phương pháp nội suy không xác định: {method}. Sử dụng 'cubic' làm mặc định.")
-                    Interpolator = CubicSpline
-
-                cs_pos = Interpolator(x, df[['x [m]', 'y [m]', 'z [m]']])
-                cs_led = Interpolator(x, df[['Red', 'Green', 'Blue']])
-
-                # Tạo dấu thời gian và dữ liệu mới
-                t_new = np.arange(0, x.iloc[-1], dt)
-                pos_new = cs_pos(t_new)
-                led_new = cs_led(t_new)
-
-                # Tính vận tốc và gia tốc
-                vel_new = cs_pos.derivative()(t_new)
-                acc_new = cs_pos.derivative().derivative()(t_new)
-
-                # Chuẩn bị khung dữ liệu cho dữ liệu mới
-                data = {
-                    'idx': np.arange(len(t_new)),
-                    't': t_new,
-                    'px': pos_new[:, 0],
-                    'py': pos_new[:, 1],
-                    'pz': pos_new[:, 2],
-                    'vx': vel_new[:, 0],
-                    'vy': vel_new[:, 1],
-                    'vz': vel_new[:, 2],
-                    'ax': acc_new[:, 0],
-                    'ay': acc_new[:, 1],
-                    'az': acc_new[:, 2],
-                    'yaw': 0,  # placeholder
-                    'mode': 70,  # placeholder
-                    'ledr': led_new[:, 0],
-                    'ledg': led_new[:, 1],
-                    'ledb': led_new[:, 2],
-                }
-
-                df_new = pd.DataFrame(data)
-
-                # Lưu vào thư mục đã xử lý
-                new_filepath = os.path.join(processed_dir, filename)
-                df_new.to_csv(new_filepath, index=False)
-
-                print(f"Processed file saved to {new_filepath}")
-
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
+    filepaths = [os.path.join(skybrush_dir, filename) for filename in sorted(os.listdir(skybrush_dir))
+                 if filename.endswith(".csv") and (only is None or filename in only)]
+    args = (processed_dir, method, dt, write_binary, output)
+    process = process_drone_file
+    if streaming:
+        args += (chunk_rows,)
+        process = process_drone_file_streaming
+
+    return run_processing(process, [(filepath, *args) for filepath in filepaths], workers)
+
+
+def run_processing(process, jobs, workers=1):
+    """
+    Run process(*job) for every job, serially or in a process pool, and print a report.
+
+    Args:
+    process (callable): process_drone_file or process_drone_file_streaming.
+    jobs (list): Argument tuples, one per drone.
+    workers (int): Xem process_drone_files.
+
+    Returns:
+    list: One result dict per job.
+    """
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [process(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process, *job) for job in jobs]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result['ok']:
+            print(f"Processed file saved to {result['output']} ({result['seconds']:.2f} s)")
+        else:
+            print(f"Error processing file {result['filename']}: {result['error']}")
+
+    failed = sum(1 for result in results if not result['ok'])
+    print(f"Processed {len(results) - failed}/{len(results)} files in {elapsed:.2f} s")
+    return results
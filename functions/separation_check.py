@@ -0,0 +1,144 @@
+# functions/separation_check.py
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def _max_step_displacement(positions, chunk=1024):
+    # Largest distance any drone moves between consecutive slices relative to the fleet's centroid,
+    # computed in chunks of slices. Two drones close in by at most twice this per slice, and a
+    # formation moving as a whole does not count.
+    n_slices = positions.shape[1]
+    steps = np.empty(max(n_slices - 1, 0))
+    for start in range(0, n_slices - 1, chunk):
+        stop = min(start + chunk, n_slices - 1)
+        moved = (positions[:, start + 1:stop + 1, :] - positions[:, start:stop, :]).astype(np.float64)
+        moved -= moved.mean(axis=0)
+        steps[start:stop] = np.sqrt((moved ** 2).sum(axis=2)).max(axis=0)
+    return steps
+
+
+def check_separation(positions, times, threshold, drone_ids=None, margin=None, max_elements=4_000_000):
+    """
+    Find every pair of drones closer than threshold at any time slice of a show.
+
+    The time slices are processed in blocks. For each block a KD-tree is built on the first
+    slice only, and candidate pairs are found within threshold plus the furthest any two drones
+    can close in on each other during the block (bounded from the per-slice displacements relative
+    to the fleet's centroid), so only pairs that can actually come closer than threshold are
+    candidates. Their exact distances are then evaluated for every slice of the block at once. This finds exactly the same violations as
+    checking all pairs at every slice, without an O(n²) distance computation.
+
+    The minimum separation is exact whenever it is below threshold. Otherwise it comes from the
+    nearest neighbour of every drone at the start of each block, followed through the block, and
+    is at most the block's closing distance (below margin) above the true minimum.
+
+    Args:
+        positions (np.ndarray): (D, T, 3) drone positions.
+        times (np.ndarray): (T,) slice times in seconds.
+        threshold (float): Minimum allowed separation in metres.
+        drone_ids (list, optional): Ids reported for the drones. Defaults to 0..D-1.
+        margin (float, optional): Maximum radius growth per block; smaller margins mean more,
+            shorter blocks with fewer candidates. Defaults to max(threshold, 1.0).
+        max_elements (int): Most pair-slice distances evaluated per block; a block with more
+            candidates is halved until it fits, which bounds the memory and time a large margin
+            or a dense formation costs.
+
+    Returns:
+        dict: min_separation, min_separation_time, min_separation_pair, first_violation_time and
+        violations {(id_a, id_b): {'first_time', 'min_distance', 'min_time'}}.
+    """
+    n_drones, n_slices, _ = positions.shape
+    drone_ids = list(range(n_drones)) if drone_ids is None else np.asarray(drone_ids).tolist()
+    report = {
+        "min_separation": np.inf,
+        "min_separation_time": None,
+        "min_separation_pair": None,
+        "first_violation_time": None,
+        "violations": {},
+    }
+    if n_drones < 2 or n_slices == 0:
+        return report
+
+    margin = max(threshold, 1.0) if margin is None else margin
+    travelled = np.concatenate(([0.0], np.cumsum(_max_step_displacement(positions))))
+
+    start = 0
+    while start < n_slices:
+        # Longest block in which no two drones can close in by more than margin
+        stop = int(np.searchsorted(travelled, travelled[start] + margin / 2, side="right"))
+        stop = max(stop, start + 1)
+
+        points = positions[:, start, :].astype(np.float64)
+        tree = cKDTree(points)
+        while True:
+            closing = 2 * (travelled[stop - 1] - travelled[start])
+            pairs = tree.query_pairs(threshold + closing + 1e-9, output_type="ndarray")
+            if len(pairs) * (stop - start) <= max_elements or stop - start == 1:
+                break
+            # Too many candidates for a block this long: halve it, which also shrinks the radius
+            stop = start + (stop - start) // 2
+
+        if report["min_separation"] >= threshold:
+            # The candidates only hold pairs that can violate threshold; until one does, also follow
+            # every drone's nearest neighbour for the minimum separation
+            # (a pair listed twice is harmless: its second entry finds the same distances)
+            pairs = np.concatenate((pairs.reshape(-1, 2), tree.query(points, k=2)[1]))
+
+        if len(pairs):
+            offsets = positions[pairs[:, 0], start:stop, :].astype(np.float64) - positions[pairs[:, 1], start:stop, :]
+            distances = np.sqrt((offsets ** 2).sum(axis=2))  # (pairs, slices in block)
+
+            flat_index = int(np.argmin(distances))
+            pair_index, slice_index = np.unravel_index(flat_index, distances.shape)
+            if distances[pair_index, slice_index] < report["min_separation"]:
+                a, b = pairs[pair_index]
+                report["min_separation"] = float(distances[pair_index, slice_index])
+                report["min_separation_time"] = float(times[start + slice_index])
+                report["min_separation_pair"] = (drone_ids[a], drone_ids[b])
+
+            violating = distances < threshold
+            for pair_index in np.flatnonzero(violating.any(axis=1)):
+                a, b = pairs[pair_index]
+                key = (drone_ids[a], drone_ids[b]) if drone_ids[a] < drone_ids[b] else (drone_ids[b], drone_ids[a])
+                first_slice = int(np.argmax(violating[pair_index]))
+                closest_slice = int(np.argmin(distances[pair_index]))
+                min_distance = float(distances[pair_index, closest_slice])
+                entry = report["violations"].get(key)
+                if entry is None:
+                    report["violations"][key] = {
+                        "first_time": float(times[start + first_slice]),
+                        "min_distance": min_distance,
+                        "min_time": float(times[start + closest_slice]),
+                    }
+                elif min_distance < entry["min_distance"]:
+                    entry["min_distance"] = min_distance
+                    entry["min_time"] = float(times[start + closest_slice])
+
+        start = stop
+
+    if report["violations"]:
+        report["first_violation_time"] = min(entry["first_time"] for entry in report["violations"].values())
+    return report
+
+
+def print_separation_report(report, threshold):
+    """
+    Print a separation report returned by check_separation.
+    """
+    if report["min_separation_pair"] is None:
+        print("Separation check: fewer than two drones, nothing to check")
+        return
+
+    a, b = report["min_separation_pair"]
+    print(f"Minimum separation {report['min_separation']:.2f} m between drones {a} and {b} "
+          f"at t={report['min_separation_time']:.2f} s")
+
+    if not report["violations"]:
+        print(f"No pairs closer than {threshold} m")
+        return
+
+    print(f"{len(report['violations'])} pairs closer than {threshold} m, first at t={report['first_violation_time']:.2f} s:")
+    for (a, b), entry in sorted(report["violations"].items(), key=lambda item: item[1]["first_time"]):
+        print(f"  Drones {a} and {b}: from t={entry['first_time']:.2f} s, "
+              f"closest {entry['min_distance']:.2f} m at t={entry['min_time']:.2f} s")
@@ -0,0 +1,114 @@
+# functions/setpoint_sender.py
+
+import asyncio
+import time
+
+import numpy as np
+
+
+class SetpointSender:
+    """
+    Non-blocking offboard setpoint sending for one drone.
+
+    Setpoints go through Offboard.set_position_velocity_acceleration_ned_raw, which takes plain
+    numbers instead of PositionNedYaw / VelocityNedYaw / AccelerationNed objects.
+
+    submit() returns immediately. Up to max_in_flight set_position_velocity_acceleration_ned calls
+    run concurrently; a setpoint submitted while the window is full waits in a single pending slot,
+    and a newer setpoint replaces it (newest wins), so a slow gRPC round-trip never delays the tick
+    loop and never builds a backlog of outdated setpoints. With max_in_flight=1 the sends are
+    strictly ordered; a larger window hides longer round-trips, but concurrent calls may reach
+    mavsdk_server out of order.
+
+    Args:
+        offboard: The drone's mavsdk Offboard plugin (drone.offboard).
+        max_in_flight (int): Maximum concurrent sends.
+        name (str, optional): Label used in error messages.
+    """
+
+    def __init__(self, offboard, max_in_flight=1, name=None):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+        self.offboard = offboard
+        self.max_in_flight = max_in_flight
+        self.name = name
+        self.in_flight = 0
+        self.sent = 0
+        self.errors = 0
+        self.replaced = 0
+        self.round_trips = []
+        self._pending = None
+        self._tasks = set()
+
+    def submit(self, position, velocity, acceleration, yaw=0.0):
+        """
+        Send a setpoint now if the window has room, otherwise keep it as the pending setpoint.
+
+        Args:
+            position, velocity, acceleration: (north, east, down) sequences.
+            yaw (float): Yaw in degrees.
+
+        Returns:
+            asyncio.Future: Resolved when the setpoint is done: True once it was sent, False if it
+            failed or a newer setpoint replaced it before it was sent.
+        """
+        setpoint = (*position, *velocity, *acceleration, yaw)
+        done = asyncio.get_running_loop().create_future()
+        if self.in_flight < self.max_in_flight:
+            self._start(setpoint, done)
+        else:
+            if self._pending is not None:
+                self.replaced += 1
+                self._pending[1].set_result(False)
+            self._pending = (setpoint, done)
+        return done
+
+    def _start(self, setpoint, done):
+        self.in_flight += 1
+        task = asyncio.ensure_future(self._send(setpoint, done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, setpoint, done):
+        start = time.monotonic()
+        try:
+            await self.offboard.set_position_velocity_acceleration_ned_raw(setpoint)
+            self.round_trips.append(time.monotonic() - start)
+            self.sent += 1
+            done.set_result(True)
+        except Exception as error:
+            self.errors += 1
+            print(f"{self.name or 'Drone'}: setpoint failed with error: {error}")
+        finally:
+            self.in_flight -= 1
+            if not done.done():
+                done.set_result(False)
+            if self._pending is not None:
+                (setpoint, pending_done), self._pending = self._pending, None
+                self._start(setpoint, pending_done)
+
+    async def drain(self):
+        """
+        Wait until every in-flight and pending setpoint has been sent.
+        """
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def round_trip_percentiles(self, percentiles=(50, 90, 99, 100)):
+        """
+        Return the round-trip time of the completed sends in milliseconds at the given percentiles.
+
+        Returns:
+            dict: {percentile: round_trip_ms}
+        """
+        if not self.round_trips:
+            return {p: 0.0 for p in percentiles}
+        values = np.percentile(np.asarray(self.round_trips) * 1000, percentiles)
+        return {p: float(v) for p, v in zip(percentiles, values)}
+
+    def summary(self):
+        """
+        One-line summary of sends and round-trip times for logging.
+        """
+        stats = ", ".join(f"p{p}={v:.1f}ms" for p, v in self.round_trip_percentiles().items())
+        return f"{self.sent} setpoints sent, {self.replaced} replaced, {self.errors} failed, round-trip {stats}"
@@ -0,0 +1,135 @@
+# functions/setpoint_trajectory.py
+
+import math
+
+import numpy as np
+
+from functions.trajectory_binary import load_trajectory, uniform_dt
+
+
+class SetpointTrajectory:
+    """
+    Trajectory container answering "which setpoint applies at time t" for offboard playback.
+
+    By default the setpoint at time t is the first sample whose time is >= t, the same rule the
+    playback loops have always used. With interpolate=True the setpoint is instead evaluated at
+    exactly t between the two surrounding samples: cubic Hermite on position using the stored
+    velocities, cubic Hermite on velocity using the stored accelerations and linear on
+    acceleration. Playback can then run at a higher rate than the file's sample rate without
+    the commanded position stepping at every sample.
+
+    On a uniform time grid the sample index is computed directly from dt; for non-uniform files
+    it falls back to a binary search. Either way the per-tick cost does not grow with the length
+    of the show.
+
+    Args:
+        data (np.ndarray): Trajectory samples as a TRAJECTORY_DTYPE array (a memmap is fine).
+        trajectory_offset (tuple): (north, east, down) offset added to every position.
+        altitude_offset (float): Altitude offset subtracted from every down position.
+        interpolate (bool): Interpolate between samples instead of holding the next sample.
+    """
+
+    def __init__(self, data, trajectory_offset=(0, 0, 0), altitude_offset=0, interpolate=False):
+        if len(data) == 0:
+            raise ValueError("Trajectory has no samples")
+        self._data = data
+        self._t = data["t"]
+        self._t0 = float(self._t[0])
+        self._dt = uniform_dt(self._t)
+        self._last_index = len(data) - 1
+        self._offset = (trajectory_offset[0], trajectory_offset[1], trajectory_offset[2] - altitude_offset)
+        self.interpolate = interpolate
+
+    @classmethod
+    def from_file(cls, filename, trajectory_offset=(0, 0, 0), altitude_offset=0, interpolate=False):
+        """
+        Load a trajectory CSV (or the .traj file next to it) into a SetpointTrajectory.
+        """
+        return cls(load_trajectory(filename), trajectory_offset, altitude_offset, interpolate)
+
+    def __len__(self):
+        return self._last_index + 1
+
+    @property
+    def duration(self):
+        """ Time of the last sample in seconds. """
+        return float(self._t[self._last_index])
+
+    @property
+    def is_uniform(self):
+        """ True if samples are evenly spaced and lookups use index arithmetic. """
+        return self._dt > 0
+
+    def index_at(self, t):
+        """
+        Return the index of the first sample with time >= t, clamped to the valid range.
+        """
+        if self._dt > 0:
+            # Small epsilon so t exactly on a sample is not pushed to the next one by rounding
+            index = math.ceil((t - self._t0) / self._dt - 1e-9)
+        else:
+            index = int(np.searchsorted(self._t, t, side="left"))
+        return min(max(index, 0), self._last_index)
+
+    def setpoint_at(self, t):
+        """
+        Return the setpoint for time t.
+
+        Returns:
+            tuple: (t, px, py, pz, vx, vy, vz, ax, ay, az, yaw, mode) with the offsets applied.
+        """
+        index = self.index_at(t)
+        if self.interpolate and index > 0 and t < self._t[index]:
+            return self._interpolated_setpoint(index, t)
+        return self._sample_setpoint(index)
+
+    def _sample_setpoint(self, index):
+        row = self._data[index]
+        return (
+            float(row["t"]),
+            float(row["px"]) + self._offset[0],
+            float(row["py"]) + self._offset[1],
+            float(row["pz"]) + self._offset[2],
+            float(row["vx"]), float(row["vy"]), float(row["vz"]),
+            float(row["ax"]), float(row["ay"]), float(row["az"]),
+            float(row["yaw"]),
+            int(row["mode"]),
+        )
+
+    def _interpolated_setpoint(self, index, t):
+        # Interpolate inside the segment between samples index - 1 and index
+        row0 = self._data[index - 1]
+        row1 = self._data[index]
+        t0 = float(row0["t"])
+        h = float(row1["t"]) - t0
+        s = (t - t0) / h
+
+        # Cubic Hermite basis functions
+        s2 = s * s
+        s3 = s2 * s
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = s3 - 2 * s2 + s
+        h01 = -2 * s3 + 3 * s2
+        h11 = s3 - s2
+
+        position = []
+        velocity = []
+        acceleration = []
+        for p, v, a in (("px", "vx", "ax"), ("py", "vy", "ay"), ("pz", "vz", "az")):
+            p0, p1 = float(row0[p]), float(row1[p])
+            v0, v1 = float(row0[v]), float(row1[v])
+            a0, a1 = float(row0[a]), float(row1[a])
+            position.append(h00 * p0 + h10 * h * v0 + h01 * p1 + h11 * h * v1)
+            velocity.append(h00 * v0 + h10 * h * a0 + h01 * v1 + h11 * h * a1)
+            acceleration.append(a0 + s * (a1 - a0))
+
+        return (
+            t,
+            position[0] + self._offset[0],
+            position[1] + self._offset[1],
+            position[2] + self._offset[2],
+            *velocity,
+            *acceleration,
+            float(row0["yaw"]),
+            int(row0["mode"]),
+        )
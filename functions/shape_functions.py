@@ -1,4 +1,4 @@
-from scipy.spatial import distance
+from scipy.spatial import cKDTree
 
 import numpy as np
 
@@ -27,6 +27,59 @@ def rotate(points, heading):
 
 
 
+def nearest_neighbours(points, k=1):
+    """
+    Find the k nearest other drones of every drone with a KD-tree.
+
+    Args:
+        points (np.ndarray): (n, 3) drone positions.
+        k (int): Number of neighbours per drone.
+
+    Returns:
+        tuple: (distances, indices), both (n, k) and sorted by distance per drone.
+    """
+    points = np.asarray(points, dtype=float)
+    k = min(k, len(points) - 1)
+    distances, indices = cKDTree(points).query(points, k=k + 1)
+    # Drop each drone itself; with coincident drones it is not necessarily the first column
+    is_self = indices == np.arange(len(points))[:, None]
+    is_self[~is_self.any(axis=1), -1] = True
+    keep = ~is_self
+    return distances[keep].reshape(len(points), k), indices[keep].reshape(len(points), k)
+
+
+def closest_pair(points):
+    """
+    Find the pair of drones that are closest to each other.
+
+    Args:
+        points (np.ndarray): (n, 3) drone positions.
+
+    Returns:
+        tuple: (i, j, distance) with i < j.
+    """
+    distances, indices = nearest_neighbours(points, k=1)
+    i = int(np.argmin(distances[:, 0]))
+    j = int(indices[i, 0])
+    return min(i, j), max(i, j), float(distances[i, 0])
+
+
+def spacing_histogram(points, bins=10, range=None):
+    """
+    Histogram of the distance from every drone to its nearest neighbour.
+
+    Args:
+        points (np.ndarray): (n, 3) drone positions.
+        bins (int or sequence): Passed to np.histogram.
+        range (tuple, optional): Passed to np.histogram.
+
+    Returns:
+        tuple: (counts, bin_edges) as returned by np.histogram.
+    """
+    distances, _ = nearest_neighbours(points, k=1)
+    return np.histogram(distances[:, 0], bins=bins, range=range)
+
+
 def closest_drones(points):
     """
     Find the pair of drones that are closest to each other.
@@ -37,13 +90,8 @@ def closest_drones(points):
     Returns:
         tuple: Indices of the drones that are closest to each other.
     """
-    # Compute the pairwise distances
-    dists = distance.squareform(distance.pdist(points))
-    # Set the diagonal to infinity to exclude self-pairs
-    np.fill_diagonal(dists, np.inf)
-    # Find the minimum distance
-    closest_pair_idx = np.unravel_index(np.argmin(dists), dists.shape)
-    return closest_pair_idx
+    i, j, _ = closest_pair(points)
+    return i, j
 
 def check_collision(points,treshhold=0.5):
     """
@@ -0,0 +1,96 @@
+# functions/show_manifest.py
+
+import json
+import os
+
+import numpy as np
+
+
+def manifest_path(processed_dir):
+    """
+    Return the path of the show manifest of a processed show directory.
+    """
+    return os.path.join(processed_dir, "show_manifest.json")
+
+
+def drone_entry(t, positions, velocities, accelerations, sha256=None):
+    """
+    Summarise one processed drone trajectory.
+
+    Args:
+        t (np.ndarray): (n,) sample times in seconds.
+        positions, velocities, accelerations (np.ndarray): (n, 3) samples, north-east-down.
+        sha256 (str, optional): Checksum of the processed trajectory file.
+
+    Returns:
+        dict: duration, samples, start, end, bbox {'min', 'max'}, max_speed, max_acceleration, sha256.
+    """
+    positions = np.asarray(positions, dtype=float)
+    return {
+        "duration": float(t[-1]),
+        "samples": int(len(t)),
+        "start": positions[0].tolist(),
+        "end": positions[-1].tolist(),
+        "bbox": {"min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+        "max_speed": float(np.linalg.norm(velocities, axis=1).max()),
+        "max_acceleration": float(np.linalg.norm(accelerations, axis=1).max()),
+        "sha256": sha256,
+    }
+
+
+def merge_drone_entries(first, second):
+    """
+    Combine the entries of two consecutive parts of one trajectory, e.g. chunks processed in turn.
+    """
+    return {
+        "duration": second["duration"],
+        "samples": first["samples"] + second["samples"],
+        "start": first["start"],
+        "end": second["end"],
+        "bbox": {
+            "min": np.minimum(first["bbox"]["min"], second["bbox"]["min"]).tolist(),
+            "max": np.maximum(first["bbox"]["max"], second["bbox"]["max"]).tolist(),
+        },
+        "max_speed": max(first["max_speed"], second["max_speed"]),
+        "max_acceleration": max(first["max_acceleration"], second["max_acceleration"]),
+        "sha256": second["sha256"],
+    }
+
+
+def read_show_manifest(processed_dir):
+    """
+    Read the show manifest of a processed show directory.
+
+    Returns:
+        dict: The manifest, or None if the directory has none. Drone entries are keyed by
+        the drone id as a string, as in the JSON file.
+    """
+    path = manifest_path(processed_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_show_manifest(processed_dir, drones, dt):
+    """
+    Write the show manifest with fleet-wide totals computed from the drone entries.
+
+    Args:
+        processed_dir (str): Processed show directory.
+        drones (dict): {drone_id: drone_entry(...)}.
+        dt (float): Sample spacing of the processed files.
+    """
+    drones = {str(drone_id): entry for drone_id, entry in drones.items()}
+    manifest = {"version": 1, "dt": dt, "drones": drones}
+    if drones:
+        entries = drones.values()
+        manifest["duration"] = max(entry["duration"] for entry in entries)
+        manifest["bbox"] = {
+            "min": np.min([entry["bbox"]["min"] for entry in entries], axis=0).tolist(),
+            "max": np.max([entry["bbox"]["max"] for entry in entries], axis=0).tolist(),
+        }
+        manifest["max_speed"] = max(entry["max_speed"] for entry in entries)
+        manifest["max_acceleration"] = max(entry["max_acceleration"] for entry in entries)
+    with open(manifest_path(processed_dir), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
@@ -1,7 +1,6 @@
 import pandas as pd
-from scipy.spatial import distance
 
-from functions.shape_functions import closest_drones
+from functions.shape_functions import closest_pair, spacing_histogram
 from functions.shape_plots import plot_2d_observer, plot_points
 
 def show_static_shape_results(points, params):
@@ -29,9 +28,15 @@ def show_static_shape_results(points, params):
     fig_2d = plot_2d_observer(points, params.heading, params.plane)
 
     # Find the pair of drones that are closest to each other
-    closest_pair = closest_drones(points[['px', 'py', 'pz']].to_numpy())
-    closest_distance = distance.euclidean(points.iloc[closest_pair[0]], points.iloc[closest_pair[1]])
-    print(f"The closest drones are {closest_pair[0]} and {closest_pair[1]} with a distance of {closest_distance:.2f} m.")
+    positions = points[['px', 'py', 'pz']].to_numpy()
+    i, j, closest_distance = closest_pair(positions)
+    print(f"The closest drones are {i} and {j} with a distance of {closest_distance:.2f} m.")
+
+    # Distribution of the distance from each drone to its nearest neighbour
+    counts, edges = spacing_histogram(positions)
+    print("Nearest neighbour spacing:")
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        print(f"  {low:6.2f} - {high:6.2f} m: {count}")
 
 
 
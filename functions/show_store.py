@@ -0,0 +1,159 @@
+# functions/show_store.py
+
+import os
+
+import numpy as np
+
+from functions.trajectory_binary import load_trajectory, to_structured
+
+SHOW_CHANNELS = ("px", "py", "pz", "vx", "vy", "vz", "ax", "ay", "az", "yaw", "ledr", "ledg", "ledb")
+POSITION = slice(0, 3)
+
+
+def show_path(processed_dir):
+    """
+    Return the path of the show store file of a processed show directory.
+    """
+    return os.path.join(processed_dir, "show.npz")
+
+
+def _drone_id(filename):
+    return int(filename.replace('Drone', '').replace('.csv', ''))
+
+
+def _processed_files(processed_dir):
+    return sorted((f for f in os.listdir(processed_dir) if f.startswith("Drone ") and f.endswith(".csv")), key=_drone_id)
+
+
+def store_is_current(processed_dir):
+    """
+    Return True if the show store of a processed show directory describes its current 'Drone N' files.
+
+    The store is stale when it is missing, older than any processed CSV or .traj file, or holds a
+    different set of drones, e.g. after the files were processed again without rebuilding the store.
+    """
+    filename = show_path(processed_dir)
+    if not os.path.exists(filename):
+        return False
+    store_mtime = os.path.getmtime(filename)
+    filenames = _processed_files(processed_dir)
+    for f in filenames:
+        for path in (os.path.join(processed_dir, f), os.path.join(processed_dir, os.path.splitext(f)[0] + ".traj")):
+            if os.path.exists(path) and os.path.getmtime(path) > store_mtime:
+                return False
+    with np.load(filename) as archive:
+        return sorted(archive["drone_ids"].tolist()) == [_drone_id(f) for f in filenames]
+
+
+class ShowStore:
+    """
+    All drones of a processed show in one (drones, samples, channels) float32 array.
+
+    Every drone shares the same time grid. Drones whose trajectory ends early hold their last sample
+    until the end of the show; lengths records how many samples of each drone are real. Cross-drone
+    queries are array slices: store.positions[:, i] is every position at sample i, and
+    store.channel('pz') every altitude of every drone.
+
+    Args:
+        drone_ids (np.ndarray): (D,) drone ids (the N of 'Drone N.csv').
+        times (np.ndarray): (T,) sample times in seconds.
+        data (np.ndarray): (D, T, len(SHOW_CHANNELS)) float32 samples, channels as in SHOW_CHANNELS.
+        modes (np.ndarray): (D, T) int16 mode codes.
+        lengths (np.ndarray): (D,) number of real samples per drone.
+    """
+
+    def __init__(self, drone_ids, times, data, modes, lengths):
+        self.drone_ids = np.asarray(drone_ids)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.data = data
+        self.modes = modes
+        self.lengths = np.asarray(lengths)
+        self._index = {int(drone_id): i for i, drone_id in enumerate(self.drone_ids)}
+
+    @classmethod
+    def from_processed(cls, processed_dir):
+        """
+        Build the store from the processed 'Drone N.csv' files (or their .traj files).
+        """
+        filenames = _processed_files(processed_dir)
+        trajectories = [load_trajectory(os.path.join(processed_dir, f)) for f in filenames]
+        if not trajectories:
+            return cls(np.zeros(0, dtype=int), np.zeros(0), np.zeros((0, 0, len(SHOW_CHANNELS)), dtype=np.float32),
+                       np.zeros((0, 0), dtype=np.int16), np.zeros(0, dtype=int))
+
+        longest = max(trajectories, key=len)
+        times = np.asarray(longest["t"], dtype=np.float64)
+        data = np.empty((len(trajectories), len(times), len(SHOW_CHANNELS)), dtype=np.float32)
+        modes = np.empty((len(trajectories), len(times)), dtype=np.int16)
+        lengths = np.empty(len(trajectories), dtype=int)
+
+        for i, trajectory in enumerate(trajectories):
+            # Sample on the common grid; times past the end of the drone's file hold its last sample
+            index = np.clip(np.searchsorted(trajectory["t"], times - 1e-9), 0, len(trajectory) - 1)
+            for c, name in enumerate(SHOW_CHANNELS):
+                data[i, :, c] = trajectory[name][index]
+            modes[i] = trajectory["mode"][index]
+            lengths[i] = len(trajectory)
+
+        return cls([_drone_id(f) for f in filenames], times, data, modes, lengths)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a store written by save.
+        """
+        with np.load(filename) as archive:
+            return cls(archive["drone_ids"], archive["times"], archive["data"], archive["modes"], archive["lengths"])
+
+    def save(self, filename):
+        """
+        Save the store as one uncompressed .npz file.
+        """
+        np.savez(filename, drone_ids=self.drone_ids, times=self.times, data=self.data,
+                 modes=self.modes, lengths=self.lengths)
+
+    def __len__(self):
+        return len(self.drone_ids)
+
+    def __contains__(self, drone_id):
+        return int(drone_id) in self._index
+
+    @property
+    def positions(self):
+        """ (D, T, 3) view of the positions of every drone. """
+        return self.data[:, :, POSITION]
+
+    def channel(self, name):
+        """
+        Return a (D, T) view of one channel of every drone.
+        """
+        return self.data[:, :, SHOW_CHANNELS.index(name)]
+
+    def index_of(self, drone_id):
+        """
+        Return the row of a drone id.
+        """
+        return self._index[int(drone_id)]
+
+    def sample_at(self, t):
+        """
+        Return the index of the first sample with time >= t, clamped to the show.
+        """
+        return min(int(np.searchsorted(self.times, t - 1e-9)), len(self.times) - 1)
+
+    def positions_at(self, t):
+        """
+        Return the (D, 3) positions of every drone at time t.
+        """
+        return self.positions[:, self.sample_at(t)]
+
+    def drone(self, drone_id):
+        """
+        Return the real samples of one drone as a TRAJECTORY_DTYPE array, e.g. for SetpointTrajectory.
+        """
+        i = self.index_of(drone_id)
+        n = self.lengths[i]
+        columns = {name: self.data[i, :n, c] for c, name in enumerate(SHOW_CHANNELS)}
+        columns["t"] = self.times[:n]
+        columns["mode"] = self.modes[i, :n]
+        return to_structured(columns)
@@ -0,0 +1,270 @@
+# functions/skyc_import.py
+
+"""
+Importer for Skybrush .skyc show bundles.
+
+A .skyc file is a zip archive whose show.json holds every drone of the show:
+
+    swarm.drones[i].settings.name        drone name, e.g. "Drone 1"
+    swarm.drones[i].settings.home        [x, y, z] start position
+    swarm.drones[i].settings.trajectory  {"points": [[t, [x, y, z], [control points]], ...]}
+    swarm.drones[i].settings.lights      {"data": base64 light program bytecode}
+
+Each trajectory point ends a Bezier segment that starts at the previous point; zero, one or two
+control points make it linear, quadratic or cubic. The segments are sampled into keyframes with
+the same columns as the Skybrush CSV export, so they can be processed without writing CSV files.
+"""
+
+import base64
+import json
+import os
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from functions.process_drone_files import process_drone_file, run_processing
+
+KEYFRAME_COLUMNS = ['Time [msec]', 'x [m]', 'y [m]', 'z [m]', 'Red', 'Green', 'Blue']
+
+# Light program durations and timestamps are counted in frames of this rate
+LIGHT_PROGRAM_FPS = 50
+
+# Light program opcodes; each is followed by its arguments (bytes for colours, varints for durations)
+END, NOP, SLEEP, WAIT_UNTIL = 0x00, 0x01, 0x02, 0x03
+SET_COLOR, SET_GRAY, SET_BLACK, SET_WHITE = 0x04, 0x05, 0x06, 0x07
+FADE_TO_COLOR, FADE_TO_GRAY, FADE_TO_BLACK, FADE_TO_WHITE = 0x08, 0x09, 0x0A, 0x0B
+LOOP_BEGIN, LOOP_END, RESET_CLOCK, JUMP = 0x0C, 0x0D, 0x0E, 0x12
+
+
+def read_show(skyc_file):
+    """
+    Return the parsed show.json of a .skyc bundle.
+    """
+    with zipfile.ZipFile(skyc_file) as archive:
+        with archive.open("show.json") as file:
+            return json.load(file)
+
+
+def sample_trajectory(points, times):
+    """
+    Evaluate a Skybrush Bezier trajectory at the given times.
+
+    Every segment is raised to a cubic Bezier and all samples are evaluated at once. Times
+    before the first point or after the last one hold the first or last position.
+
+    Args:
+        points (list): Trajectory points [t, [x, y, z], [control points]].
+        times (np.ndarray): (n,) sample times in seconds.
+
+    Returns:
+        np.ndarray: (n, 3) positions.
+    """
+    t = np.array([point[0] for point in points], dtype=float)
+    p = np.array([point[1] for point in points], dtype=float)
+    if len(points) == 1:
+        return np.repeat(p, len(times), axis=0)
+
+    # Cubic control points of every segment
+    start, end = p[:-1], p[1:]
+    c1 = np.empty_like(start)
+    c2 = np.empty_like(start)
+    for i, point in enumerate(points[1:]):
+        controls = np.asarray(point[2] if len(point) > 2 else [], dtype=float).reshape(-1, 3)
+        if len(controls) == 0:
+            c1[i] = start[i] + (end[i] - start[i]) / 3
+            c2[i] = start[i] + 2 * (end[i] - start[i]) / 3
+        elif len(controls) == 1:
+            c1[i] = start[i] + 2 * (controls[0] - start[i]) / 3
+            c2[i] = end[i] + 2 * (controls[0] - end[i]) / 3
+        else:
+            c1[i], c2[i] = controls[0], controls[1]
+
+    times = np.clip(times, t[0], t[-1])
+    segment = np.clip(np.searchsorted(t, times, side="right") - 1, 0, len(t) - 2)
+    length = t[segment + 1] - t[segment]
+    u = np.divide(times - t[segment], length, out=np.ones_like(times), where=length > 0)[:, None]
+    v = 1 - u
+    return (v ** 3 * start[segment] + 3 * v ** 2 * u * c1[segment]
+            + 3 * v * u ** 2 * c2[segment] + u ** 3 * end[segment])
+
+
+def _varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+
+def decode_light_program(data, end_time, max_steps=1000000):
+    """
+    Decode a Skybrush light program into colour segments, as far as it is understood.
+
+    Supports the colour, fade, sleep, wait, loop and clock commands. Decoding stops at END, at an
+    unknown command, after end_time or after max_steps commands (for endless loops and jumps).
+
+    Args:
+        data (bytes): Light program bytecode.
+        end_time (float): Show duration in seconds.
+        max_steps (int): Maximum number of commands executed.
+
+    Returns:
+        list: (start time, end time, start colour, end colour) segments in seconds and 0-255 RGB.
+    """
+    segments = []
+    color = np.zeros(3)
+    clock = 0.0  # start of the current clock, moved by RESET_CLOCK
+    now = 0.0
+    loops = []
+    offset = 0
+    steps = 0
+
+    def advance(target, duration):
+        nonlocal color, now
+        segments.append((now, now + duration, color, target))
+        color = target
+        now += duration
+
+    while offset < len(data) and now <= end_time and steps < max_steps:
+        steps += 1
+        code = data[offset]
+        offset += 1
+        if code == END:
+            break
+        elif code == NOP:
+            pass
+        elif code == SLEEP:
+            frames, offset = _varint(data, offset)
+            advance(color, frames / LIGHT_PROGRAM_FPS)
+        elif code == WAIT_UNTIL:
+            frames, offset = _varint(data, offset)
+            advance(color, max(clock + frames / LIGHT_PROGRAM_FPS - now, 0))
+        elif code in (SET_COLOR, SET_GRAY, SET_BLACK, SET_WHITE, FADE_TO_COLOR, FADE_TO_GRAY, FADE_TO_BLACK, FADE_TO_WHITE):
+            if code in (SET_COLOR, FADE_TO_COLOR):
+                target = np.array(list(data[offset:offset + 3]), dtype=float)
+                offset += 3
+            elif code in (SET_GRAY, FADE_TO_GRAY):
+                target = np.full(3, float(data[offset]))
+                offset += 1
+            else:
+                target = np.full(3, 0.0 if code in (SET_BLACK, FADE_TO_BLACK) else 255.0)
+            frames, offset = _varint(data, offset)
+            if code in (SET_COLOR, SET_GRAY, SET_BLACK, SET_WHITE):
+                color = target
+            advance(target, frames / LIGHT_PROGRAM_FPS)
+        elif code == LOOP_BEGIN:
+            iterations = data[offset]
+            offset += 1
+            loops.append([offset, iterations])  # 0 iterations loops forever
+        elif code == LOOP_END:
+            if loops:
+                loop = loops[-1]
+                if loop[1] != 1:
+                    loop[1] = max(loop[1] - 1, 0)
+                    offset = loop[0]
+                else:
+                    loops.pop()
+        elif code == RESET_CLOCK:
+            clock = now
+        elif code == JUMP:
+            offset, _ = _varint(data, offset)
+        else:
+            print(f"Unknown light program command {code:#04x} at byte {offset - 1}, ignoring the rest of the program")
+            break
+
+    segments.append((now, np.inf, color, color))
+    return segments
+
+
+def sample_lights(segments, times):
+    """
+    Evaluate decoded light program segments at the given times.
+
+    Returns:
+        np.ndarray: (n, 3) RGB values.
+    """
+    starts = np.array([segment[0] for segment in segments])
+    ends = np.array([segment[1] for segment in segments])
+    first = np.array([segment[2] for segment in segments], dtype=float).reshape(-1, 3)
+    last = np.array([segment[3] for segment in segments], dtype=float).reshape(-1, 3)
+
+    # Last segment starting at or before each time; zero-length segments are skipped that way
+    index = np.clip(np.searchsorted(starts, times, side="right") - 1, 0, len(segments) - 1)
+    length = ends[index] - starts[index]
+    fraction = np.divide(times - starts[index], length, out=np.ones_like(times),
+                         where=np.isfinite(length) & (length > 0))
+    fraction = np.where(np.isfinite(length), np.clip(fraction, 0, 1), 0)[:, None]
+    return first[index] + (last[index] - first[index]) * fraction
+
+
+def drone_filename(name, index):
+    """
+    Return the 'Drone N.csv' name used for a drone of the show: N is the number in its name, or its position.
+    """
+    match = re.search(r"(\d+)\s*$", name or "")
+    return f"Drone {int(match.group(1)) if match else index + 1}.csv"
+
+
+def read_skyc_keyframes(skyc_file, keyframe_dt=0.25):
+    """
+    Decode every drone of a .skyc bundle into keyframes in the Skybrush CSV layout.
+
+    Trajectories are sampled every keyframe_dt seconds and at every trajectory point, so
+    holds and sharp corners are kept. Lights are sampled at the same times.
+
+    Args:
+        skyc_file (str): Path of the .skyc bundle.
+        keyframe_dt (float): Keyframe spacing in seconds. Mặc định là 0,25 (như bản xuất CSV).
+
+    Returns:
+        dict: {'Drone N.csv': pd.DataFrame with KEYFRAME_COLUMNS}
+    """
+    show = read_show(skyc_file)
+    keyframes = {}
+    for index, drone in enumerate(show["swarm"]["drones"]):
+        settings = drone["settings"]
+        points = settings["trajectory"]["points"]
+        end_time = float(points[-1][0])
+
+        # Whole milliseconds, as in the CSV export
+        grid = np.arange(0, end_time, keyframe_dt)
+        milliseconds = np.unique(np.round(np.concatenate((grid, [point[0] for point in points])) * 1000))
+        times = milliseconds / 1000
+
+        positions = sample_trajectory(points, times)
+        lights = settings.get("lights") or {}
+        if lights.get("data"):
+            colors = sample_lights(decode_light_program(base64.b64decode(lights["data"]), end_time), times)
+        else:
+            colors = np.zeros((len(times), 3))
+
+        data = np.column_stack((milliseconds, positions, np.round(colors)))
+        keyframes[drone_filename(settings.get("name"), index)] = pd.DataFrame(data, columns=KEYFRAME_COLUMNS)
+    return keyframes
+
+
+def process_skyc(skyc_file, processed_dir, method='cubic', dt=0.05, write_binary=True, output='samples', workers=1, keyframe_dt=0.25):
+    """
+    Process every drone of a .skyc bundle into processed_dir without intermediate CSV files.
+
+    Args:
+        skyc_file (str): Path of the .skyc bundle.
+        keyframe_dt (float): See read_skyc_keyframes.
+        processed_dir, method, dt, write_binary, output, workers: Xem process_drone_files.
+
+    Returns:
+        list: One result dict per drone (see process_drone_file), or None if processed_dir is missing.
+    """
+    if not os.path.exists(processed_dir):
+        print(f"Directory not found: {processed_dir}")
+        return
+
+    keyframes = read_skyc_keyframes(skyc_file, keyframe_dt)
+    jobs = [(filename, processed_dir, method, dt, write_binary, output, frame) for filename, frame in keyframes.items()]
+    return run_processing(process_drone_file, jobs, workers)
@@ -0,0 +1,311 @@
+# functions/slot_assignment.py
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+
+from functions.show_manifest import read_show_manifest
+
+
+def _normalised(points):
+    scale = points.std(axis=0)
+    return (points - points.mean(axis=0)) / np.where(scale > 0, scale, 1)
+
+
+def _candidates(current, targets, k):
+    """
+    Candidate (drone, target) edges for large fleets, sorted by drone then target.
+
+    The k nearest targets of every drone and nearest drones of every target, both in the original
+    coordinates and after normalising each point set to zero mean and unit spread (so a formation
+    that is scaled or shifted as a whole still finds its counterpart points). A pairing of the two
+    sets in sorted order is added so the candidates always contain a full assignment.
+    """
+    normalised_current = _normalised(current)
+    normalised_targets = _normalised(targets)
+    rows = []
+    cols = []
+    for a, b in ((current, targets), (normalised_current, normalised_targets)):
+        _, nearest = cKDTree(b).query(a, k=min(k, len(b)))
+        rows.append(np.repeat(np.arange(len(a)), nearest.size // len(a)))
+        cols.append(nearest.ravel())
+        _, nearest = cKDTree(a).query(b, k=min(k, len(a)))
+        rows.append(nearest.ravel())
+        cols.append(np.repeat(np.arange(len(b)), nearest.size // len(b)))
+
+    order_current = np.lexsort(normalised_current.T[::-1])
+    order_targets = np.lexsort(normalised_targets.T[::-1])
+    rows.append(order_current)
+    cols.append(order_targets[np.arange(len(current)) * len(targets) // len(current)])
+
+    keys = np.unique(np.concatenate(rows) * len(targets) + np.concatenate(cols))
+    return keys // len(targets), keys % len(targets)
+
+
+def _sparse_assignment(rows, cols, cost, n_drones, n_targets):
+    """
+    Minimum-cost assignment of every drone over a sparse set of candidate edges.
+
+    Solved exactly with min_weight_full_bipartite_matching (LAPJVsp), also when there are more
+    targets than drones. The candidates must contain a full assignment, as _candidates ensures.
+
+    Args:
+        rows, cols, cost: Drone, target and cost of each candidate edge.
+        n_drones, n_targets (int): Number of drones and targets.
+
+    Returns:
+        np.ndarray: Target assigned to each drone.
+    """
+    # Sparse matrices drop zero entries; every assignment has n_drones edges, so a constant
+    # added to every cost keeps zero-distance edges without changing the optimum
+    matrix = csr_matrix((np.asarray(cost, dtype=float) + 1, (rows, cols)), shape=(n_drones, n_targets))
+    drone_index, target_index = min_weight_full_bipartite_matching(matrix)
+    assigned = np.empty(n_drones, dtype=int)
+    assigned[drone_index] = target_index
+    return assigned
+
+
+def _dense_bottleneck(distances):
+    # Smallest threshold that still allows every drone a slot, by binary search over the distances
+    values = np.unique(distances)
+    low, high = 0, len(values) - 1
+    while low < high:
+        middle = (low + high) // 2
+        too_long = (distances > values[middle]).astype(float)
+        rows, cols = linear_sum_assignment(too_long)
+        if too_long[rows, cols].sum() == 0:
+            high = middle
+        else:
+            low = middle + 1
+    # Minimum total distance among the assignments within the threshold
+    penalised = distances + (distances > values[low]) * (distances.sum() + 1)
+    rows, cols = linear_sum_assignment(penalised)
+    return cols[np.argsort(rows)]
+
+
+def assign_slots(current, targets, objective="sum", dense_limit=1000, neighbours=16):
+    """
+    Assign every drone a distinct target point.
+
+    With objective='sum' the total flight distance is minimised. With objective='bottleneck' the
+    longest single flight is minimised first, then the total distance among those assignments;
+    this shortens the transition, which lasts as long as its slowest drone.
+
+    Fleets up to dense_limit drones are solved exactly over all pairs with the Hungarian method
+    (linear_sum_assignment). Larger fleets are solved exactly over a sparse set of candidate pairs
+    found with KD-trees (min_weight_full_bipartite_matching), which is optimal over the candidates
+    and takes seconds for thousands of drones. There the bottleneck objective is approximated by minimising the sum of distance**4.
+
+    Args:
+        current (np.ndarray): (n, d) current drone positions.
+        targets (np.ndarray): (m, d) target points, m >= n.
+        objective (str): 'sum' or 'bottleneck'.
+        dense_limit (int): Largest fleet solved exactly over all pairs.
+        neighbours (int): Number of nearest candidates per point for large fleets.
+
+    Returns:
+        np.ndarray: (n,) index of the target assigned to each drone.
+    """
+    current = np.asarray(current, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    if len(current) > len(targets):
+        raise ValueError(f"{len(current)} drones but only {len(targets)} target points")
+    if objective not in ("sum", "bottleneck"):
+        raise ValueError(f"Unknown assignment objective: {objective}")
+    if len(current) == 0:
+        return np.zeros(0, dtype=int)
+
+    if len(current) <= dense_limit:
+        distances = cdist(current, targets)
+        if objective == "bottleneck":
+            return _dense_bottleneck(distances)
+        rows, cols = linear_sum_assignment(distances)
+        return cols[np.argsort(rows)]
+
+    rows, cols = _candidates(current, targets, neighbours)
+    cost = np.linalg.norm(current[rows] - targets[cols], axis=1)
+    if objective == "bottleneck":
+        cost = (cost / cost.max()) ** 4
+    return _sparse_assignment(rows, cols, cost, len(current), len(targets))
+
+
+def assignment_distances(current, targets, slots):
+    """
+    Return the distance each drone flies for an assignment returned by assign_slots.
+    """
+    return np.linalg.norm(np.asarray(targets, dtype=float)[slots] - np.asarray(current, dtype=float), axis=1)
+
+
+def formation_start_points(skybrush_dir, processed_dir=None):
+    """
+    Read the first (x, y) point of every drone of a show.
+
+    The start points come from the show manifest of processed_dir when it has one, otherwise from
+    the first row of every Skybrush file.
+
+    Returns:
+        tuple: (pos_ids list, (n, 2) array of start points)
+    """
+    show_manifest = read_show_manifest(processed_dir) if processed_dir else None
+    if show_manifest is not None:
+        pos_ids = sorted(int(drone_id) for drone_id in show_manifest['drones'])
+        points = [show_manifest['drones'][str(pos_id)]['start'][:2] for pos_id in pos_ids]
+        return pos_ids, np.array(points, dtype=float).reshape(-1, 2)
+
+    pos_ids = []
+    points = []
+    for filename in sorted(os.listdir(skybrush_dir)):
+        if filename.endswith(".csv"):
+            df = pd.read_csv(os.path.join(skybrush_dir, filename), nrows=1)
+            pos_ids.append(int(filename.replace('Drone', '').replace('.csv', '')))
+            points.append((df.loc[0, 'x [m]'], df.loc[0, 'y [m]']))
+    return pos_ids, np.array(points, dtype=float).reshape(-1, 2)
+
+
+def assign_config_slots(skybrush_dir, config_file, objective="sum", processed_dir=None, **kwargs):
+    """
+    Choose which physical drone flies which Skybrush trajectory and write it to the config file.
+
+    The current drone positions are the 'x' and 'y' columns of the config file; the targets are the
+    start points of the show (see formation_start_points). Each row's 'pos_id' is set to the assigned trajectory
+    (Drone <pos_id>.csv); 'x' and 'y' stay the drone's current position, so playback can fly it from
+    there to its start point first (see TransitionTrajectory).
+
+    Args:
+        skybrush_dir (str): Directory with the Skybrush drone files.
+        config_file (str): Path of the config file to update.
+        objective (str): 'sum' or 'bottleneck', see assign_slots.
+        processed_dir (str, optional): Processed show directory whose show manifest provides the start points.
+        **kwargs: Passed to assign_slots.
+
+    Returns:
+        dict: {hw_id: pos_id}
+    """
+    config_df = pd.read_csv(config_file)
+    pos_ids, targets = formation_start_points(skybrush_dir, processed_dir)
+    if len(pos_ids) != len(config_df):
+        raise ValueError(f"{len(config_df)} drones in {config_file} but {len(pos_ids)} trajectories in the show")
+
+    current = config_df[['x', 'y']].to_numpy(dtype=float)
+    slots = assign_slots(current, targets, objective, **kwargs)
+
+    before = {pos_id: i for i, pos_id in enumerate(pos_ids)}
+    previous_slots = np.array([before.get(int(pos_id), -1) for pos_id in config_df['pos_id']])
+    if (previous_slots >= 0).all():
+        distances = assignment_distances(current, targets, previous_slots)
+        print(f"Previous assignment: total {distances.sum():.2f} m, longest {distances.max():.2f} m")
+    distances = assignment_distances(current, targets, slots)
+    print(f"New assignment: total {distances.sum():.2f} m, longest {distances.max():.2f} m")
+
+    config_df['pos_id'] = [pos_ids[slot] for slot in slots]
+    config_df.to_csv(config_file, index=False)
+    print(f"Config file updated: {config_file}")
+    return dict(zip(config_df['hw_id'].tolist(), config_df['pos_id'].tolist()))
+
+
+def transition_move_time(config_file, processed_dir, speed, min_distance=0.1):
+    """
+    Return how long the move-to-slot leg takes for the drones of a config file.
+
+    Every drone moves for the same time, so the legs start and end together: the longest distance
+    between a drone's config position and the start point of its trajectory (pos_id), at speed.
+
+    Args:
+        config_file (str): Path of the config file.
+        processed_dir (str): Processed show directory whose show manifest provides the start points.
+        speed (float): Speed of the farthest drone, in m/s.
+        min_distance (float): Distance below which a drone counts as standing on its start point.
+
+    Returns:
+        float: Move time in seconds, 0.0 if every drone stands on its start point, or None if the
+        show manifest does not describe every trajectory of the config file.
+    """
+    show_manifest = read_show_manifest(processed_dir)
+    if show_manifest is None:
+        return None
+    config_df = pd.read_csv(config_file)
+    entries = [show_manifest['drones'].get(str(int(pos_id))) for pos_id in config_df['pos_id']]
+    if any(entry is None for entry in entries):
+        return None
+    starts = np.array([entry['start'][:2] for entry in entries], dtype=float).reshape(-1, 2)
+    longest = np.linalg.norm(config_df[['x', 'y']].to_numpy(dtype=float) - starts, axis=1).max(initial=0.0)
+    return float(longest / speed) if longest > min_distance else 0.0
+
+
+def _smooth_step(p0, p1, u, duration):
+    # Position, velocity and acceleration of a rest-to-rest cubic move from p0 to p1, u in [0, 1]
+    delta = p1 - p0
+    return (p0 + delta * (3 * u ** 2 - 2 * u ** 3),
+            delta * 6 * u * (1 - u) / duration,
+            delta * (6 - 12 * u) / duration ** 2)
+
+
+class TransitionTrajectory:
+    """
+    A trajectory with a move-to-slot leg in front of it, for a drone that does not stand on its start point.
+
+    The leg climbs altitude metres above the start height, moves in a straight line from home to
+    above the start point in move_time and descends onto it, each part starting and ending at
+    rest; then the trajectory is played back, shifted by the leg's duration. Give every drone the
+    same move_time (transition_move_time) so the legs of the fleet run together.
+
+    Args:
+        trajectory: SetpointTrajectory or SplineTrajectory to fly after the leg.
+        home (tuple): (north, east) of the drone in the trajectory's frame, i.e. its config x and y.
+        move_time (float): Duration of the horizontal move in seconds.
+        altitude (float): Height of the move above the start point, in metres.
+        climb_time (float): Duration of the climb and of the descent in seconds.
+    """
+
+    def __init__(self, trajectory, home, move_time, altitude, climb_time):
+        self.trajectory = trajectory
+        self.move_time = float(move_time)
+        self.climb_time = float(climb_time)
+        self.leg_duration = 2 * self.climb_time + self.move_time
+        start = np.array(trajectory.setpoint_at(0.0)[1:4], dtype=float)
+        above_start = start - (0.0, 0.0, altitude)
+        above_home = np.array((home[0], home[1], above_start[2]), dtype=float)
+        ground_home = np.array((home[0], home[1], start[2]), dtype=float)
+        self._yaw = trajectory.setpoint_at(0.0)[10]
+        # (start time, duration, from, to, mode) of the climb, the move and the descent
+        self._phases = (
+            (0.0, self.climb_time, ground_home, above_home, 10),
+            (self.climb_time, self.move_time, above_home, above_start, 30),
+            (self.climb_time + self.move_time, self.climb_time, above_start, start, 30),
+        )
+
+    @property
+    def duration(self):
+        """ Duration of the leg and the trajectory in seconds. """
+        return self.leg_duration + self.trajectory.duration
+
+    def setpoint_at(self, t):
+        """
+        Return the setpoint for time t, see SetpointTrajectory.setpoint_at.
+        """
+        if t >= self.leg_duration:
+            return (t, *self.trajectory.setpoint_at(t - self.leg_duration)[1:])
+        for start, duration, p0, p1, mode in self._phases:
+            if duration > 0 and t < start + duration:
+                u = max(t - start, 0.0) / duration
+                position, velocity, acceleration = _smooth_step(p0, p1, u, duration)
+                return (t, *position.tolist(), *velocity.tolist(), *acceleration.tolist(), self._yaw, mode)
+        return (t, *self.trajectory.setpoint_at(0.0)[1:])
+
+
+if __name__ == "__main__":
+    # Check the sparse solver against linear_sum_assignment on a small case with more targets than drones
+    rng = np.random.default_rng(0)
+    current = rng.uniform(0, 20, (40, 2))
+    targets = rng.uniform(0, 20, (55, 2))
+    sparse_total = assignment_distances(current, targets, assign_slots(current, targets, dense_limit=0, neighbours=55)).sum()
+    rows, cols = linear_sum_assignment(cdist(current, targets))
+    dense_total = cdist(current, targets)[rows, cols].sum()
+    assert abs(sparse_total - dense_total) < 1e-9, (sparse_total, dense_total)
+    print(f"Sparse assignment matches linear_sum_assignment: total {sparse_total:.3f} m")
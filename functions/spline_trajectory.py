@@ -0,0 +1,128 @@
+# functions/spline_trajectory.py
+
+import math
+import os
+
+import numpy as np
+
+from functions.trajectory_binary import uniform_dt
+
+
+def spline_path(csv_path):
+    """
+    Return the path of the spline coefficient file that belongs to a processed trajectory CSV file.
+    """
+    return os.path.splitext(csv_path)[0] + ".spline.npz"
+
+
+def spline_is_current(csv_path):
+    """
+    Return True if the spline file of a processed trajectory CSV file exists and is not older than the CSV file.
+
+    Processing writes the spline file after the CSV file, so an older spline file was left by an earlier run.
+    """
+    path = spline_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+
+def save_spline(filename, pos_spline, led_spline, mode=70):
+    """
+    Save the piecewise polynomials fitted by process_drone_files.
+
+    Args:
+        filename (str): Output path, normally spline_path(csv_path).
+        pos_spline: CubicSpline / Akima1DInterpolator fitted to the (x, y, z) positions.
+        led_spline: CubicSpline / Akima1DInterpolator fitted to the (R, G, B) LED values.
+        mode (int): Mode code reported for every setpoint.
+    """
+    np.savez_compressed(
+        filename,
+        breakpoints=np.asarray(pos_spline.x, dtype=np.float64),
+        pos_coefficients=np.asarray(pos_spline.c, dtype=np.float64),
+        led_coefficients=np.asarray(led_spline.c, dtype=np.float64),
+        mode=np.int16(mode),
+    )
+
+
+class SplineTrajectory:
+    """
+    Playback-side evaluator for spline coefficient files.
+
+    Holds the breakpoints and the cubic coefficients of each interval (as stored by save_spline)
+    and evaluates position, velocity and acceleration at any time with Horner's rule. It needs
+    only NumPy, so it runs on the companion computers without SciPy, and it offers the same
+    interface as SetpointTrajectory (duration, setpoint_at) so either can be played back.
+
+    Args:
+        breakpoints (np.ndarray): (n,) interval boundaries in seconds.
+        pos_coefficients (np.ndarray): (4, n - 1, 3) position coefficients, highest power first.
+        led_coefficients (np.ndarray, optional): (4, n - 1, 3) LED coefficients.
+        trajectory_offset (tuple): (north, east, down) offset added to every position.
+        altitude_offset (float): Altitude offset subtracted from every down position.
+        mode (int): Mode code reported for every setpoint.
+    """
+
+    def __init__(self, breakpoints, pos_coefficients, led_coefficients=None, trajectory_offset=(0, 0, 0), altitude_offset=0, mode=70):
+        self.breakpoints = np.asarray(breakpoints, dtype=np.float64)
+        self.pos_coefficients = np.asarray(pos_coefficients, dtype=np.float64)
+        self.led_coefficients = led_coefficients
+        self.mode = int(mode)
+        self._t0 = float(self.breakpoints[0])
+        self._dt = uniform_dt(self.breakpoints)
+        self._last_interval = len(self.breakpoints) - 2
+        self._offset = np.array([trajectory_offset[0], trajectory_offset[1], trajectory_offset[2] - altitude_offset])
+
+    @classmethod
+    def from_file(cls, filename, trajectory_offset=(0, 0, 0), altitude_offset=0):
+        """
+        Load a spline coefficient file written by save_spline.
+        """
+        with np.load(filename) as data:
+            return cls(data["breakpoints"], data["pos_coefficients"], data["led_coefficients"],
+                       trajectory_offset, altitude_offset, int(data["mode"]))
+
+    @property
+    def duration(self):
+        """ Time of the last breakpoint in seconds. """
+        return float(self.breakpoints[-1])
+
+    def interval_at(self, t):
+        """
+        Return the index of the polynomial interval containing t, clamped to the valid range.
+        """
+        if self._dt > 0:
+            index = math.floor((t - self._t0) / self._dt)
+        else:
+            index = int(np.searchsorted(self.breakpoints, t, side="right")) - 1
+        return min(max(index, 0), self._last_interval)
+
+    def _evaluate(self, coefficients, t):
+        t = min(max(t, self._t0), self.duration)
+        index = self.interval_at(t)
+        c = coefficients[:, index, :]
+        dx = t - self.breakpoints[index]
+        position = ((c[0] * dx + c[1]) * dx + c[2]) * dx + c[3]
+        velocity = (3 * c[0] * dx + 2 * c[1]) * dx + c[2]
+        acceleration = 6 * c[0] * dx + 2 * c[1]
+        return position, velocity, acceleration
+
+    def setpoint_at(self, t):
+        """
+        Return the setpoint for time t.
+
+        Returns:
+            tuple: (t, px, py, pz, vx, vy, vz, ax, ay, az, yaw, mode) with the offsets applied.
+        """
+        position, velocity, acceleration = self._evaluate(self.pos_coefficients, t)
+        position = position + self._offset
+        return (t, *position.tolist(), *velocity.tolist(), *acceleration.tolist(), 0.0, self.mode)
+
+    def led_at(self, t):
+        """
+        Return the (R, G, B) LED values at time t, or None if the file has no LED coefficients.
+        """
+        if self.led_coefficients is None:
+            return None
+        return tuple(self._evaluate(self.led_coefficients, t)[0].tolist())
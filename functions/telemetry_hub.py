@@ -0,0 +1,334 @@
+# functions/telemetry_hub.py
+
+import asyncio
+import time
+from collections import deque
+
+# Put in a subscriber's queue when its stream has ended
+_END = object()
+
+
+class TelemetryStreamEnded(Exception):
+    """
+    Raised by a TelemetryStream wait when its source has ended without an error.
+    """
+
+
+class LatestValue:
+    """
+    Single-slot, latest-only mailbox: a put replaces any value that has not been read yet.
+
+    Has the put_nowait/get interface of asyncio.Queue, so it can stand in for one where a slow
+    reader should only ever see the newest value and memory must not grow with its lag.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._value = None
+        self._full = False
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def put_nowait(self, value):
+        """
+        Store value, dropping the unread one if there is one.
+
+        Returns:
+            bool: True if an unread value was dropped.
+        """
+        dropped = self._full
+        if dropped:
+            self.dropped += 1
+        self._value = value
+        self._full = True
+        self._ready.set()
+        return dropped
+
+    async def get(self):
+        """
+        Wait for a value and take it; after close, an empty mailbox returns an end marker instead of waiting.
+        """
+        await self._ready.wait()
+        if not self._full:
+            return _END
+        value, self._value = self._value, None
+        self._full = False
+        if not self._closed:
+            self._ready.clear()
+        return value
+
+    def close(self):
+        """
+        Wake the reader for good: once the unread value is taken, get() returns the end marker.
+        """
+        self._closed = True
+        self._ready.set()
+
+
+class ConflatingStream:
+    """
+    Latest-only adapter for an async telemetry generator.
+
+    A background task reads the source as fast as it produces, and the consumer iterating the
+    adapter always gets the newest value; values that arrive while the consumer is busy replace
+    each other and are counted in dropped. Wrap any mavsdk telemetry generator, e.g.
+    `async for position in ConflatingStream(drone.telemetry.position())`.
+
+    Args:
+        source: Async iterator of telemetry values.
+    """
+
+    def __init__(self, source):
+        self.received = 0
+        self._slot = LatestValue()
+        self._error = None
+        self._task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source):
+        try:
+            async for value in source:
+                self.received += 1
+                self._slot.put_nowait(value)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self._error = error
+        finally:
+            # Wake the consumer so it sees the end of the source after its last value
+            self._slot.close()
+
+    @property
+    def dropped(self):
+        """ Values replaced before the consumer read them. """
+        return self._slot.dropped
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        value = await self._slot.get()
+        if value is _END:
+            if self._error is not None:
+                raise self._error
+            raise StopAsyncIteration
+        return value
+
+    def close(self):
+        """
+        Stop reading the source.
+        """
+        self._task.cancel()
+
+
+class TelemetryStream:
+    """
+    One shared subscription to a mavsdk telemetry stream.
+
+    A background task consumes the stream and keeps the latest value with its monotonic
+    timestamp, an optional ring buffer of the last history values, and hands every value to the
+    consumers iterating updates(). Any number of consumers can read latest, await next() /
+    wait_for() or iterate updates() while only one gRPC stream is open. dropped counts the values
+    conflating consumers skipped.
+
+    When the source ends or fails, closed is set and every waiter is woken: next() and wait_for()
+    raise the source's error (or TelemetryStreamEnded) instead of waiting forever, and updates()
+    stops after the values already received.
+
+    Args:
+        name (str): Stream name, e.g. 'position'.
+        source: Async iterator of telemetry values, e.g. drone.telemetry.position().
+        history (int): Number of (timestamp, value) pairs kept in the ring buffer; 0 keeps none.
+    """
+
+    def __init__(self, name, source, history=0):
+        self.name = name
+        self.value = None
+        self.timestamp = None
+        self.count = 0
+        self.dropped = 0
+        self.error = None
+        self.closed = False
+        self.history = deque(maxlen=history) if history else None
+        self._source = source
+        self._subscribers = set()
+        self._updated = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source):
+        try:
+            async for value in source:
+                self._publish(value)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self.error = error
+            print(f"Telemetry stream {self.name} stopped with error: {error}")
+        finally:
+            self._finish()
+
+    def _finish(self):
+        self.closed = True
+        for queue in self._subscribers:
+            if isinstance(queue, LatestValue):
+                queue.close()
+            else:
+                queue.put_nowait(_END)
+        self._updated.set()
+
+    def _raise_closed(self):
+        if self.error is not None:
+            raise self.error
+        raise TelemetryStreamEnded(f"Telemetry stream {self.name} has ended")
+
+    def _publish(self, value):
+        now = time.monotonic()
+        self.value = value
+        self.timestamp = now
+        self.count += 1
+        if self.history is not None:
+            self.history.append((now, value))
+        for queue in self._subscribers:
+            if queue.put_nowait(value):
+                self.dropped += 1
+        # Wake every waiter of this update, later waiters wait for the next one
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    @property
+    def age(self):
+        """ Seconds since the latest value arrived, or None before the first one. """
+        return None if self.timestamp is None else time.monotonic() - self.timestamp
+
+    async def next(self):
+        """
+        Wait for the next value and return it.
+
+        Raises:
+            The source's error, or TelemetryStreamEnded, if the stream ends first.
+        """
+        count = self.count
+        if self.closed:
+            self._raise_closed()
+        await self._updated.wait()
+        if self.count == count:
+            self._raise_closed()
+        return self.value
+
+    async def wait_for(self, predicate=None, timeout=None):
+        """
+        Return the latest value if it satisfies predicate, otherwise wait for the first new one that does.
+
+        Args:
+            predicate (callable, optional): Test on the value; None accepts any value.
+            timeout (float, optional): Seconds to wait before raising asyncio.TimeoutError.
+
+        Raises:
+            The source's error, or TelemetryStreamEnded, if the stream ends before a value satisfies predicate.
+        """
+        async def wait():
+            value = self.value
+            while self.count == 0 or (predicate is not None and not predicate(value)):
+                value = await self.next()
+            return value
+
+        return await asyncio.wait_for(wait(), timeout)
+
+    async def updates(self, conflate=False):
+        """
+        Yield the values received from now on, in order, until the stream ends.
+
+        Args:
+            conflate (bool): Only yield the newest value each time the consumer asks for one and
+                drop the ones that arrived in between, instead of queueing every value.
+        """
+        queue = LatestValue() if conflate else asyncio.Queue()
+        if self.closed:
+            return
+        self._subscribers.add(queue)
+        try:
+            while True:
+                value = await queue.get()
+                if value is _END:
+                    return
+                yield value
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def source_dropped(self):
+        """ Values a conflating source (ConflatingStream) replaced before the stream read them. """
+        return getattr(self._source, "dropped", 0)
+
+    def close(self):
+        """
+        Stop the subscription.
+        """
+        self._task.cancel()
+        if isinstance(self._source, ConflatingStream):
+            self._source.close()
+
+
+class TelemetryHub:
+    """
+    Shared telemetry of one drone on top of its mavsdk Telemetry plugin.
+
+    Each stream (named after its Telemetry method: 'position', 'health', 'landed_state', ...) is
+    subscribed once, when it is first used, and shared by every consumer through a TelemetryStream.
+    With conflate, each mavsdk generator is read through a ConflatingStream, so the shared stream
+    only ever publishes the newest message: when the event loop falls behind, intermediate
+    messages are dropped and counted instead of being worked through in order.
+
+    Args:
+        telemetry: The drone's mavsdk Telemetry plugin (drone.telemetry).
+        history (dict, optional): {stream name: ring buffer length} for the streams that keep history.
+        conflate (bool): Read every stream latest-only.
+    """
+
+    def __init__(self, telemetry, history=None, conflate=False):
+        self.telemetry = telemetry
+        self.history = history or {}
+        self.conflate = conflate
+        self.streams = {}
+
+    def stream(self, name):
+        """
+        Return the shared stream of a Telemetry method, subscribing on first use.
+        """
+        if name not in self.streams:
+            source = getattr(self.telemetry, name)()
+            if self.conflate:
+                source = ConflatingStream(source)
+            self.streams[name] = TelemetryStream(name, source, self.history.get(name, 0))
+        return self.streams[name]
+
+    def latest(self, name):
+        """
+        Return the latest value of a stream, or None if none has arrived yet.
+        """
+        return self.stream(name).value
+
+    async def wait_for(self, name, predicate=None, timeout=None):
+        """
+        Return the latest (or first following) value of a stream that satisfies predicate, see TelemetryStream.wait_for.
+        """
+        return await self.stream(name).wait_for(predicate, timeout)
+
+    def updates(self, name, conflate=False):
+        """
+        Iterate the new values of a stream, every one or only the newest (conflate), see TelemetryStream.updates.
+        """
+        return self.stream(name).updates(conflate)
+
+    def summary(self):
+        """
+        One-line summary of the messages used and dropped per stream for logging.
+        """
+        return ", ".join(f"{name} {stream.count} used, {stream.dropped + stream.source_dropped} dropped"
+                         for name, stream in self.streams.items())
+
+    def close(self):
+        """
+        Stop every subscription of the hub.
+        """
+        for stream in self.streams.values():
+            stream.close()
@@ -0,0 +1,101 @@
+# functions/tick_scheduler.py
+
+import asyncio
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+Tick = namedtuple('Tick', 'index t lateness')
+
+LATE_POLICIES = ("skip", "catch_up")
+
+
+class TickScheduler:
+    """
+    Drift-free periodic scheduler for playback loops.
+
+    Tick k is due at start + k * period on the monotonic clock, and the time handed to the
+    loop body is read from that clock instead of being summed from steps. The latency of
+    the loop body and scheduler jitter therefore never accumulate into show time.
+
+    Late ticks are handled by late_policy:
+        "skip":     when one or more deadlines have already passed, run the most recent one
+                    right away and drop the older ones. The last tick is never skipped, so the
+                    end of the show is always reached.
+        "catch_up": run every missed tick back-to-back without sleeping until on schedule.
+                    A late tick gets its deadline as t, so the missed ticks replay the
+                    setpoints they should have sent instead of repeating the current one.
+
+    Args:
+        period (float): Tick period in seconds.
+        late_policy (str): "skip" or "catch_up".
+        clock (callable): Monotonic clock returning seconds.
+    """
+
+    def __init__(self, period, late_policy="skip", clock=time.monotonic):
+        if late_policy not in LATE_POLICIES:
+            raise ValueError(f"Unknown late tick policy: {late_policy}. Options are {LATE_POLICIES}")
+        self.period = period
+        self.late_policy = late_policy
+        self.clock = clock
+        self.lateness = []
+        self.skipped = 0
+
+    async def ticks(self, duration):
+        """
+        Yield a Tick for every deadline from 0 to duration seconds (inclusive).
+
+        Each Tick carries its index, the elapsed time t read from the clock (the deadline
+        for late ticks under "catch_up", at most duration), and how late it started relative
+        to its deadline.
+        """
+        start = self.clock()
+        index = 0
+        # Last deadline within duration, with the same rounding as index * period <= duration
+        last_index = max(math.floor(duration / self.period), 0)
+        while (last_index + 1) * self.period <= duration:
+            last_index += 1
+        while last_index > 0 and last_index * self.period > duration:
+            last_index -= 1
+        while index <= last_index:
+            deadline = start + index * self.period
+            now = self.clock()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                now = self.clock()
+
+            lateness = now - deadline
+            self.lateness.append(lateness)
+            if self.late_policy == "catch_up" and lateness > 0:
+                yield Tick(index, index * self.period, lateness)
+            else:
+                yield Tick(index, min(now - start, duration), lateness)
+
+            index += 1
+            if self.late_policy == "skip":
+                # Jump to the latest deadline that has already passed; older ones are dropped
+                latest_due = min(math.floor((self.clock() - start) / self.period), last_index)
+                if latest_due > index:
+                    self.skipped += latest_due - index
+                    index = latest_due
+
+    def lateness_percentiles(self, percentiles=(50, 90, 99, 100)):
+        """
+        Return the tick start lateness in milliseconds at the given percentiles.
+
+        Returns:
+            dict: {percentile: lateness_ms}
+        """
+        if not self.lateness:
+            return {p: 0.0 for p in percentiles}
+        values = np.percentile(np.asarray(self.lateness) * 1000, percentiles)
+        return {p: float(v) for p, v in zip(percentiles, values)}
+
+    def summary(self):
+        """
+        One-line summary of tick lateness for logging.
+        """
+        stats = ", ".join(f"p{p}={v:.1f}ms" for p, v in self.lateness_percentiles().items())
+        return f"{len(self.lateness)} ticks, {self.skipped} skipped, lateness {stats}"
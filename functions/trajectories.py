@@ -1,6 +1,8 @@
 import time
 import math
 
+import numpy as np
+
 
 def map_shape_to_code(shape_name):
     """
@@ -257,3 +259,285 @@ def square_trajectory(step, maneuver_time, diameter, direction, initial_alt, ste
     az = 0
 
     return x, y, z, vx, vy, vz, ax, ay, az
+
+
+# ---------------------------------------------------------------------------
+# Array forms
+#
+# Each *_array function mirrors its scalar counterpart above but takes a whole
+# vector of step indices and returns an (N, 9) array with the columns
+# x, y, z, vx, vy, vz, ax, ay, az. The math is kept term-for-term identical to
+# the scalar versions so both forms produce the same samples.
+# ---------------------------------------------------------------------------
+
+
+def _stack_columns(steps, *columns):
+    """
+    Broadcast scalar or per-step columns to len(steps) and stack them as (N, len(columns)).
+    """
+    n = len(steps)
+    out = np.empty((n, len(columns)))
+    for i, column in enumerate(columns):
+        out[:, i] = column
+    return out
+
+
+def sine_wave_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time, turns):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time * turns
+
+    x = diameter * t / maneuver_time
+    y = diameter * np.sin(theta)
+    z = -1 * initial_alt
+
+    vx = diameter / maneuver_time
+    vy = diameter * np.cos(theta) * 2 * direction * np.pi * turns / maneuver_time
+    vz = 0
+
+    ax = -diameter * np.sin(theta) * 2 * direction * np.pi * turns / maneuver_time ** 2
+    ay = diameter * np.cos(theta) * 4 * direction * np.pi * turns ** 2 / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def infinity_shape_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time
+
+    x = (diameter / 2) * np.sin(theta)
+    y = direction * (diameter / 4) * np.sin(2 * theta)
+    z = -1 * initial_alt
+
+    vx = (diameter / 2) * np.cos(theta) * 2 * direction * np.pi / maneuver_time
+    vy = direction * (diameter / 4) * np.cos(2 * theta) * 4 * direction * np.pi / maneuver_time
+    vz = 0
+
+    ax = -(diameter / 2) * np.sin(theta) * 4 * direction * np.pi * np.cos(theta) / maneuver_time ** 2
+    ay = -direction * (diameter / 4) * np.sin(2 * theta) * 8 * direction * np.pi * np.cos(2 * theta) / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def spiral_square_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time, turns):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time * turns
+
+    r = diameter * t / maneuver_time
+    x = r * np.cos(theta)
+    y = r * np.sin(theta)
+    z = -1 * initial_alt
+
+    vx = diameter * (np.cos(theta) - t * np.sin(theta)) / maneuver_time
+    vy = diameter * (np.sin(theta) + t * np.cos(theta)) / maneuver_time
+    vz = 0
+
+    ax = -diameter * np.sin(theta) * 2 * direction * np.pi * turns / maneuver_time ** 2
+    ay = diameter * np.cos(theta) * 4 * direction * np.pi * turns ** 2 / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def star_shape_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time, points):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time
+
+    r = diameter * (1 - np.sin(points * theta))
+    x = r * np.cos(theta)
+    y = r * np.sin(theta)
+    z = -1 * initial_alt
+
+    vx = diameter * (np.cos(theta) - points * np.cos(points * theta)) / maneuver_time
+    vy = diameter * (np.sin(theta) - points * np.sin(points * theta)) / maneuver_time
+    vz = 0
+
+    ax = -diameter * np.sin(theta) * 4 * direction * np.pi * points * np.cos(theta) / maneuver_time ** 2
+    ay = -diameter * np.sin(2 * theta) * 8 * direction * np.pi * points * np.cos(2 * theta) / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def zigzag_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time, turns):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time * turns
+
+    x = diameter * t / maneuver_time
+    y = diameter * np.sin(theta)
+    z = -1 * initial_alt
+
+    vx = diameter / maneuver_time
+    vy = diameter * np.cos(theta) * 2 * direction * np.pi * turns / maneuver_time
+    vz = 0
+
+    ax = -diameter * np.sin(theta) * 2 * direction * np.pi * turns / maneuver_time ** 2
+    ay = diameter * np.cos(theta) * 4 * direction * np.pi * turns ** 2 / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def heart_shape_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time
+
+    radius = diameter / 2
+    scale_factor = 30 / 400  # Adjust the scale factor to match the desired ratio
+
+    x = scale_factor * radius * 16 * np.sin(theta) ** 3
+    y = radius * (13 * np.cos(theta) - 5 * np.cos(2 * theta) - 2 * np.cos(3 * theta) - np.cos(4 * theta)) / 13
+    z = -1 * initial_alt
+
+    vx = scale_factor * radius * 48 * np.pi * np.sin(theta) ** 2 * np.cos(theta) / maneuver_time
+    vy = radius * (13 * np.sin(theta) - 10 * np.sin(2 * theta) - 6 * np.sin(3 * theta) - 4 * np.sin(4 * theta)) * 2 * np.pi / (13 * maneuver_time)
+    vz = 0
+
+    ax = -scale_factor * radius * 48 * np.pi * np.sin(theta) ** 3 * np.cos(theta) / maneuver_time ** 2
+    ay = -radius * (13 * np.cos(theta) - 10 * np.cos(2 * theta) - 6 * np.cos(3 * theta) - 4 * np.cos(4 * theta)) * 4 * np.pi ** 2 / (13 * maneuver_time ** 2)
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def helix_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time, end_altitude, turns):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time * turns
+
+    x = (diameter / 2) * np.cos(theta)
+    y = (diameter / 2) * np.sin(theta)
+    z = -1 * (initial_alt + (end_altitude - initial_alt) * (t / maneuver_time))
+
+    vx = -(diameter / 2) * np.sin(theta) * 2 * direction * np.pi * turns / maneuver_time
+    vy = (diameter / 2) * np.cos(theta) * 2 * direction * np.pi * turns / maneuver_time
+    vz = -1 * (initial_alt - end_altitude) / maneuver_time
+
+    ax = -(diameter / 2) * np.cos(theta) * 4 * direction * np.pi * turns ** 2 / maneuver_time ** 2
+    ay = -(diameter / 2) * np.sin(theta) * 4 * direction * np.pi * turns ** 2 / maneuver_time ** 2
+    az = -1 * (initial_alt - end_altitude) / maneuver_time ** 2
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def eight_shape_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time
+
+    x = (diameter / 2) * np.sin(theta)
+    y = direction * (diameter / 4) * np.sin(2 * theta)
+    z = -1 * initial_alt
+
+    vx = (diameter / 2) * np.cos(theta) * 2 * direction * np.pi / maneuver_time
+    vy = direction * (diameter / 4) * np.cos(2 * theta) * 4 * direction * np.pi / maneuver_time
+    vz = 0
+
+    ax = -(diameter / 2) * np.sin(theta) * 4 * direction * np.pi ** 2 / maneuver_time ** 2
+    ay = -direction * (diameter / 4) * np.sin(2 * theta) * 8 * direction * np.pi ** 2 / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def circle_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    theta = 2 * direction * np.pi * t / maneuver_time
+
+    x = (diameter / 2) * np.cos(theta)
+    y = (diameter / 2) * np.sin(theta)
+    z = -1 * initial_alt
+
+    vx = -(diameter / 2) * np.sin(theta) * 2 * direction * np.pi / maneuver_time
+    vy = (diameter / 2) * np.cos(theta) * 2 * direction * np.pi / maneuver_time
+    vz = 0
+
+    ax = -(diameter / 2) * np.cos(theta) * 4 * direction * np.pi ** 2 / maneuver_time ** 2
+    ay = -(diameter / 2) * np.sin(theta) * 4 * direction * np.pi ** 2 / maneuver_time ** 2
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+def square_trajectory_array(steps, maneuver_time, diameter, direction, initial_alt, step_time):
+    steps = np.asarray(steps)
+    t = steps * step_time
+    side_length = diameter / math.sqrt(2)
+    side_time = maneuver_time / 4
+    side_steps = int(maneuver_time / (4 * step_time))
+
+    current_side = steps // side_steps
+    side_progress = (steps % side_steps) / side_steps
+
+    x = np.select(
+        [current_side == 0, current_side == 1, current_side == 2],
+        [side_length * side_progress, side_length, side_length * (1 - side_progress)],
+        0.0,
+    )
+    y = np.select(
+        [current_side == 0, current_side == 1, current_side == 2],
+        [0.0, side_length * side_progress, side_length],
+        side_length * (1 - side_progress),
+    )
+
+    if direction == -1:
+        x, y = y, x
+
+    z = -1 * initial_alt
+
+    even_side = (current_side == 0) | (current_side == 2)
+    odd_side = (current_side == 1) | (current_side == 3)
+
+    vx = np.where(even_side, side_length / side_time, 0.0)
+    vy = np.where(odd_side, side_length / side_time, 0.0)
+    vz = 0
+
+    if direction == -1:
+        vx, vy = vy, vx
+
+    ax = np.where(even_side, -side_length / side_time ** 2 * np.sin(2 * direction * np.pi * t / maneuver_time), 0.0)
+    ay = np.where(odd_side, -side_length / side_time ** 2 * np.cos(2 * direction * np.pi * t / maneuver_time), 0.0)
+    az = 0
+
+    return _stack_columns(steps, x, y, z, vx, vy, vz, ax, ay, az)
+
+
+# Maps every scalar shape function to its array form
+_ARRAY_FORMS = {
+    sine_wave_trajectory: sine_wave_trajectory_array,
+    infinity_shape_trajectory: infinity_shape_trajectory_array,
+    spiral_square_trajectory: spiral_square_trajectory_array,
+    star_shape_trajectory: star_shape_trajectory_array,
+    zigzag_trajectory: zigzag_trajectory_array,
+    heart_shape_trajectory: heart_shape_trajectory_array,
+    helix_trajectory: helix_trajectory_array,
+    eight_shape_trajectory: eight_shape_trajectory_array,
+    circle_trajectory: circle_trajectory_array,
+    square_trajectory: square_trajectory_array,
+}
+
+
+def get_array_trajectory(shape_fcn):
+    """
+    Return the array form of a scalar shape function.
+
+    The array form takes the same arguments as the scalar function, except that `step`
+    is a vector of step indices, and returns an (N, 9) array of x, y, z, vx, vy, vz, ax, ay, az.
+
+    Args:
+        shape_fcn (callable): Scalar shape function as returned by map_shape_to_code.
+
+    Returns:
+        callable: The matching *_array function.
+    """
+    if shape_fcn not in _ARRAY_FORMS:
+        raise ValueError(f"No array form for shape function: {shape_fcn.__name__}")
+    return _ARRAY_FORMS[shape_fcn]
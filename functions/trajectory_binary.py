@@ -0,0 +1,184 @@
+# functions/trajectory_binary.py
+
+"""
+Compact binary trajectory format (.traj) written next to the trajectory CSV files.
+
+Layout:
+    header      HEADER_STRUCT: magic, version, number of mode entries, CRC32 of the data block,
+                number of samples, dt (0.0 if the time grid is not uniform), data offset
+    mode table  one MODE_ENTRY_STRUCT per run of equal mode codes: mode, first index, count
+    padding     up to a 64-byte boundary
+    data        n_samples records of TRAJECTORY_DTYPE
+
+The data block is a plain array of fixed-size records, so it can be opened with np.memmap:
+loading costs no parsing and the pages are shared between every process that maps the file.
+"""
+
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"LSDTRAJ\0"
+VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sHHIQdQ")
+MODE_ENTRY_STRUCT = struct.Struct("<iII")
+DATA_ALIGNMENT = 64
+
+TRAJECTORY_COLUMNS = ["t", "px", "py", "pz", "vx", "vy", "vz", "ax", "ay", "az", "yaw", "mode", "ledr", "ledg", "ledb"]
+
+# Time is kept in float64 so long shows keep sub-millisecond resolution; everything else fits in
+# float32. align=True pads each record to 64 bytes.
+TRAJECTORY_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("px", "<f4"), ("py", "<f4"), ("pz", "<f4"),
+    ("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4"),
+    ("ax", "<f4"), ("ay", "<f4"), ("az", "<f4"),
+    ("yaw", "<f4"),
+    ("ledr", "<f4"), ("ledg", "<f4"), ("ledb", "<f4"),
+    ("mode", "<i2"),
+], align=True)
+
+
+def binary_path(csv_path):
+    """
+    Return the path of the binary trajectory file that belongs to a trajectory CSV file.
+    """
+    return os.path.splitext(csv_path)[0] + ".traj"
+
+
+def to_structured(columns):
+    """
+    Convert named trajectory columns into a TRAJECTORY_DTYPE array.
+
+    Args:
+        columns: Anything indexable by column name (pd.DataFrame, dict of arrays, structured array).
+                 Missing 'yaw' defaults to 0, missing LED columns default to NaN.
+
+    Returns:
+        np.ndarray: Structured array of TRAJECTORY_DTYPE.
+    """
+    n = len(columns["t"])
+    data = np.zeros(n, dtype=TRAJECTORY_DTYPE)
+    for name in TRAJECTORY_DTYPE.names:
+        try:
+            data[name] = np.asarray(columns[name], dtype=float)
+        except (KeyError, ValueError):
+            data[name] = np.nan if name.startswith("led") else 0
+    return data
+
+
+def _mode_table(modes):
+    """
+    Run-length encode the mode column into (mode, first index, count) entries.
+    """
+    if len(modes) == 0:
+        return []
+    starts = np.flatnonzero(np.diff(modes)) + 1
+    starts = np.concatenate(([0], starts))
+    counts = np.diff(np.concatenate((starts, [len(modes)])))
+    return [(int(modes[s]), int(s), int(c)) for s, c in zip(starts, counts)]
+
+
+def uniform_dt(t, tolerance=1e-6):
+    """
+    Return the sample spacing if the time grid is uniform, otherwise 0.0.
+    """
+    if len(t) < 2:
+        return 0.0
+    steps = np.diff(np.asarray(t, dtype=float))
+    dt = float(steps[0])
+    if dt > 0 and np.all(np.abs(steps - dt) <= tolerance):
+        return dt
+    return 0.0
+
+
+def write_trajectory_binary(filename, columns):
+    """
+    Write a trajectory to the binary format.
+
+    Args:
+        filename (str): Output path, normally binary_path(csv_path).
+        columns: Trajectory data, see to_structured().
+    """
+    data = columns if getattr(columns, "dtype", None) == TRAJECTORY_DTYPE else to_structured(columns)
+    payload = data.tobytes()
+    modes = _mode_table(data["mode"])
+    dt = uniform_dt(data["t"])
+
+    header_size = HEADER_STRUCT.size + MODE_ENTRY_STRUCT.size * len(modes)
+    data_offset = -(-header_size // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    with open(filename, "wb") as file:
+        file.write(HEADER_STRUCT.pack(MAGIC, VERSION, len(modes), zlib.crc32(payload), len(data), dt, data_offset))
+        for entry in modes:
+            file.write(MODE_ENTRY_STRUCT.pack(*entry))
+        file.write(b"\0" * (data_offset - header_size))
+        file.write(payload)
+
+
+def read_trajectory_header(filename):
+    """
+    Read only the header and mode table of a binary trajectory file.
+
+    Returns:
+        dict: version, n_samples, dt, checksum, data_offset and modes [(mode, first index, count), ...].
+    """
+    with open(filename, "rb") as file:
+        magic, version, n_modes, checksum, n_samples, dt, data_offset = HEADER_STRUCT.unpack(file.read(HEADER_STRUCT.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a binary trajectory file: {filename}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary trajectory version {version} in {filename}")
+        modes = [MODE_ENTRY_STRUCT.unpack(file.read(MODE_ENTRY_STRUCT.size)) for _ in range(n_modes)]
+
+    return {
+        "version": version,
+        "n_samples": n_samples,
+        "dt": dt,
+        "checksum": checksum,
+        "data_offset": data_offset,
+        "modes": modes,
+    }
+
+
+def read_trajectory_binary(filename, verify=False):
+    """
+    Open a binary trajectory file as a read-only memory map.
+
+    Args:
+        filename (str): Path of the .traj file.
+        verify (bool): Check the CRC32 of the data block. This touches every page, so it is off by default.
+
+    Returns:
+        tuple: (header dict, np.memmap of TRAJECTORY_DTYPE)
+    """
+    header = read_trajectory_header(filename)
+    if header["n_samples"] == 0:
+        return header, np.zeros(0, dtype=TRAJECTORY_DTYPE)
+
+    data = np.memmap(filename, dtype=TRAJECTORY_DTYPE, mode="r", offset=header["data_offset"], shape=(header["n_samples"],))
+    if verify and zlib.crc32(data.tobytes()) != header["checksum"]:
+        raise ValueError(f"Checksum mismatch in binary trajectory file: {filename}")
+    return header, data
+
+
+def load_trajectory(csv_path):
+    """
+    Load a trajectory, preferring the memory-mapped binary file over parsing the CSV.
+
+    The binary file is used when it exists and is not older than the CSV file.
+
+    Args:
+        csv_path (str): Path of the trajectory CSV file.
+
+    Returns:
+        np.ndarray: Array (or memmap) of TRAJECTORY_DTYPE.
+    """
+    traj_path = binary_path(csv_path)
+    if os.path.exists(traj_path) and (not os.path.exists(csv_path) or os.path.getmtime(traj_path) >= os.path.getmtime(csv_path)):
+        return read_trajectory_binary(traj_path)[1]
+
+    return to_structured(pd.read_csv(csv_path))
@@ -0,0 +1,152 @@
+# functions/trajectory_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = "shapes/cache"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+
+# Source files whose content is part of every cache key: editing a shape, the segment
+# pipeline or the writers of the cached files invalidates all previously cached trajectories.
+_FUNCTIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSION_FILES = (
+    os.path.join(_FUNCTIONS_DIR, "trajectories.py"),
+    os.path.join(_FUNCTIONS_DIR, "create_active_csv.py"),
+    os.path.join(_FUNCTIONS_DIR, "export_and_plot_shape.py"),
+    os.path.join(_FUNCTIONS_DIR, "trajectory_binary.py"),
+)
+
+
+class TrajectoryCache:
+    """
+    Content-addressed on-disk cache for generated shape trajectories.
+
+    Each entry is a directory named after the SHA-256 of the generation parameters plus the
+    contents of VERSION_FILES. It holds the trajectory array (trajectory.npy), the parameters
+    (params.json) and any extra files stored with it (CSV, .traj, plots). Entries are evicted
+    least-recently-used first once the cache grows past max_bytes.
+
+    Args:
+        cache_dir (str): Directory holding the cache entries.
+        max_bytes (int): Size cap for the whole cache.
+        version_files (tuple): Source files hashed into every key.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, version_files=VERSION_FILES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._version = self._hash_files(version_files)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _hash_files(paths):
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as file:
+                digest.update(file.read())
+        return digest.hexdigest()
+
+    def key(self, params):
+        """
+        Return the cache key for a parameter set.
+
+        Args:
+            params (dict): Every input of the trajectory generation (shape_name, diameter, step_time, ...).
+        """
+        payload = json.dumps({"params": params, "version": self._version}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, params):
+        return os.path.join(self.cache_dir, self.key(params))
+
+    @staticmethod
+    def _touch(entry_dir):
+        # Entry mtime is the LRU clock
+        os.utime(entry_dir, None)
+
+    def get(self, params):
+        """
+        Return the cached trajectory array for params, or None on a miss.
+        """
+        entry_dir = self._entry_dir(params)
+        array_path = os.path.join(entry_dir, "trajectory.npy")
+        if not os.path.exists(array_path):
+            return None
+
+        self._touch(entry_dir)
+        return np.load(array_path)
+
+    def put(self, params, trajectory, files=None):
+        """
+        Store a trajectory and optional files for params, then evict old entries over the size cap.
+
+        Args:
+            params (dict): Parameter set the trajectory was generated from.
+            trajectory (np.ndarray): Generated trajectory array.
+            files (dict, optional): Mapping of entry file name to the path of a file to copy into the entry.
+
+        Returns:
+            str: The cache key.
+        """
+        key = self.key(params)
+        entry_dir = os.path.join(self.cache_dir, key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        np.save(os.path.join(entry_dir, "trajectory.npy"), trajectory)
+        with open(os.path.join(entry_dir, "params.json"), "w") as file:
+            json.dump(params, file, indent=2, default=str)
+        for name, path in (files or {}).items():
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(entry_dir, name))
+
+        self._touch(entry_dir)
+        self.evict()
+        return key
+
+    def restore(self, params, files):
+        """
+        Copy files stored with a cached entry back to their destinations.
+
+        Args:
+            params (dict): Parameter set of the entry.
+            files (dict): Mapping of entry file name to destination path.
+
+        Returns:
+            bool: True if every requested file was restored.
+        """
+        entry_dir = self._entry_dir(params)
+        restored = True
+        for name, destination in files.items():
+            source = os.path.join(entry_dir, name)
+            if os.path.exists(source):
+                shutil.copyfile(source, destination)
+            else:
+                restored = False
+        return restored
+
+    def _entries(self):
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if not os.path.isdir(entry_dir):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+        return entries
+
+    def evict(self):
+        """
+        Remove least-recently-used entries until the cache fits in max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            print(f"Evicted cached trajectory {os.path.basename(entry_dir)}")
@@ -0,0 +1,210 @@
+# functions/trajectory_simplify.py
+
+"""
+Trajectory simplification: keep only the samples playback cannot rebuild from their neighbours.
+
+Holds and straight climbs or transits are sampled every dt like the rest of a trajectory, although
+cubic Hermite interpolation between their end points (on position with the stored velocities, on
+velocity with the stored accelerations, as SetpointTrajectory does with interpolate=True) rebuilds
+them exactly. simplify_trajectory removes such samples with a Ramer-Douglas-Peucker split: a span
+between two kept samples is accepted if every removed sample is rebuilt within the position,
+velocity and acceleration tolerances, otherwise it is split at the worst sample. Samples where the
+mode, the yaw or the LED colour changes are always kept, so mode boundaries and colour changes stay
+exact.
+
+The kept samples are written as 'Drone N.simplified.traj' next to the processed CSV, in the binary
+trajectory format (with a non-uniform time grid), and played back with interpolation on.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from functions.trajectory_binary import TRAJECTORY_DTYPE, load_trajectory, read_trajectory_binary, write_trajectory_binary
+
+
+def simplified_path(csv_path):
+    """
+    Return the path of the simplified trajectory file that belongs to a trajectory CSV file.
+    """
+    return os.path.splitext(csv_path)[0] + ".simplified.traj"
+
+
+def _hermite(k0, k1, t):
+    # Position, velocity and acceleration between keyframes k0 and k1 (structured arrays of equal
+    # length), with the same formulas as SetpointTrajectory._interpolated_setpoint
+    t0 = k0["t"]
+    h = k1["t"] - t0
+    s = (t - t0) / h
+    s2 = s * s
+    s3 = s2 * s
+    h00 = 2 * s3 - 3 * s2 + 1
+    h10 = s3 - 2 * s2 + s
+    h01 = -2 * s3 + 3 * s2
+    h11 = s3 - s2
+
+    position = np.empty((len(t), 3))
+    velocity = np.empty((len(t), 3))
+    acceleration = np.empty((len(t), 3))
+    for i, (p, v, a) in enumerate((("px", "vx", "ax"), ("py", "vy", "ay"), ("pz", "vz", "az"))):
+        p0, p1 = k0[p].astype(float), k1[p].astype(float)
+        v0, v1 = k0[v].astype(float), k1[v].astype(float)
+        a0, a1 = k0[a].astype(float), k1[a].astype(float)
+        position[:, i] = h00 * p0 + h10 * h * v0 + h01 * p1 + h11 * h * v1
+        velocity[:, i] = h00 * v0 + h10 * h * a0 + h01 * v1 + h11 * h * a1
+        acceleration[:, i] = a0 + s * (a1 - a0)
+    return position, velocity, acceleration
+
+
+def reconstruct(keyframes, t):
+    """
+    Rebuild the samples of a simplified trajectory at the given times.
+
+    Uses the playback rule of SetpointTrajectory with interpolate=True: a time on a keyframe returns
+    the keyframe, a time between two keyframes is interpolated and takes yaw, mode and LEDs from
+    the earlier one, times outside the trajectory are clamped to its ends.
+
+    Args:
+        keyframes (np.ndarray): TRAJECTORY_DTYPE array written by simplify_trajectory.
+        t (np.ndarray): (n,) sample times in seconds, e.g. the time grid of the original file.
+
+    Returns:
+        np.ndarray: (n,) TRAJECTORY_DTYPE samples.
+    """
+    t = np.asarray(t, dtype=float)
+    index = np.clip(np.searchsorted(keyframes["t"], t, side="left"), 0, len(keyframes) - 1)
+    samples = np.array(keyframes[index])
+    between = (index > 0) & (t < keyframes["t"][index])
+    if between.any():
+        k0 = keyframes[index[between] - 1]
+        k1 = keyframes[index[between]]
+        position, velocity, acceleration = _hermite(k0, k1, t[between])
+        rows = np.array(k0)
+        rows["t"] = t[between]
+        for i, (p, v, a) in enumerate((("px", "vx", "ax"), ("py", "vy", "ay"), ("pz", "vz", "az"))):
+            rows[p] = position[:, i]
+            rows[v] = velocity[:, i]
+            rows[a] = acceleration[:, i]
+        samples[between] = rows
+    return samples
+
+
+def _changes(values):
+    # Indices i where values[i + 1] differs from values[i]; NaN equals NaN
+    values = np.asarray(values, dtype=float)
+    return (values[1:] != values[:-1]) & ~(np.isnan(values[1:]) & np.isnan(values[:-1]))
+
+
+def simplify_trajectory(data, position_tolerance=0.02, velocity_tolerance=0.05, acceleration_tolerance=0.2):
+    """
+    Remove the samples that Hermite interpolation between the kept ones rebuilds within tolerance.
+
+    Args:
+        data (np.ndarray): TRAJECTORY_DTYPE samples (a memmap is fine).
+        position_tolerance (float): Largest position error of a removed sample, in metres.
+        velocity_tolerance (float): Largest velocity error of a removed sample, in m/s.
+        acceleration_tolerance (float, optional): Largest acceleration error of a removed sample, in m/s².
+            Acceleration is interpolated linearly; None does not bound it.
+
+    Returns:
+        np.ndarray: The kept samples as a new TRAJECTORY_DTYPE array. The first and last sample and the
+        samples on both sides of every mode, yaw or LED change are always kept.
+    """
+    n = len(data)
+    if n <= 2:
+        return np.array(data, dtype=TRAJECTORY_DTYPE)
+
+    t = np.asarray(data["t"], dtype=float)
+    position = np.column_stack([data[name] for name in ("px", "py", "pz")]).astype(float)
+    velocity = np.column_stack([data[name] for name in ("vx", "vy", "vz")]).astype(float)
+    acceleration = np.column_stack([data[name] for name in ("ax", "ay", "az")]).astype(float)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    # Playback holds mode, yaw and LEDs from the earlier keyframe, so their changes cannot be interpolated
+    changed = np.diff(data["mode"]) != 0
+    for name in ("yaw", "ledr", "ledg", "ledb"):
+        changed |= _changes(data[name])
+    changes = np.flatnonzero(changed)
+    keep[changes] = True
+    keep[changes + 1] = True
+
+    # Ramer-Douglas-Peucker between consecutive forced samples
+    forced = np.flatnonzero(keep)
+    spans = [(a, b) for a, b in zip(forced[:-1], forced[1:]) if b - a > 1]
+    while spans:
+        a, b = spans.pop()
+        inner = slice(a + 1, b)
+        count = b - a - 1
+        k0 = np.repeat(data[a:a + 1], count)
+        k1 = np.repeat(data[b:b + 1], count)
+        p, v, acc = _hermite(k0, k1, t[inner])
+
+        error = np.linalg.norm(p - position[inner], axis=1) / position_tolerance
+        error = np.maximum(error, np.linalg.norm(v - velocity[inner], axis=1) / velocity_tolerance)
+        if acceleration_tolerance is not None:
+            error = np.maximum(error, np.linalg.norm(acc - acceleration[inner], axis=1) / acceleration_tolerance)
+
+        worst = int(np.argmax(error))
+        if error[worst] > 1:
+            m = a + 1 + worst
+            keep[m] = True
+            if m - a > 1:
+                spans.append((a, m))
+            if b - m > 1:
+                spans.append((m, b))
+
+    return np.array(data[keep], dtype=TRAJECTORY_DTYPE)
+
+
+def read_simplified(csv_path):
+    """
+    Open the simplified trajectory of a trajectory CSV file as a memory map.
+
+    Returns:
+        np.ndarray: TRAJECTORY_DTYPE memmap, or None if there is no simplified file or it is older than the CSV file.
+    """
+    path = simplified_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(csv_path) and os.path.getmtime(path) < os.path.getmtime(csv_path):
+        return None
+    return read_trajectory_binary(path)[1]
+
+
+def simplify_file(csv_path, position_tolerance=0.02, velocity_tolerance=0.05, acceleration_tolerance=0.2):
+    """
+    Simplify a trajectory file and write simplified_path(csv_path).
+
+    Module-level so it can be sent to a worker process by run_processing; errors are caught and
+    reported in the result instead of raised.
+
+    Args:
+        csv_path (str): Trajectory CSV file (its .traj file is used when up to date).
+        position_tolerance, velocity_tolerance, acceleration_tolerance: See simplify_trajectory.
+
+    Returns:
+        dict: filename, ok (bool), error (str or None), seconds, output path, samples and kept (sample counts).
+    """
+    start = time.perf_counter()
+    output = simplified_path(csv_path)
+    samples = kept = 0
+    try:
+        data = load_trajectory(csv_path)
+        keyframes = simplify_trajectory(data, position_tolerance, velocity_tolerance, acceleration_tolerance)
+        write_trajectory_binary(output, keyframes)
+        samples, kept = len(data), len(keyframes)
+        error = None
+    except Exception as e:
+        error = str(e)
+
+    return {
+        'filename': os.path.basename(csv_path),
+        'ok': error is None,
+        'error': error,
+        'seconds': time.perf_counter() - start,
+        'output': output,
+        'samples': samples,
+        'kept': kept,
+    }
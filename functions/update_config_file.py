@@ -1,42 +1,63 @@
 import pandas as pd
 import os
 
+from functions.show_manifest import read_show_manifest
 
-def update_config_file(skybrush_dir, config_file):
+
+def update_config_file(skybrush_dir, config_file, only=None, processed_dir=None):
     """
         Chức năng cập nhật cột 'x' và 'y' của tệp cấu hình với vị trí ban đầu của từng drone.
 
         Tham số:
-        skybrush_dir (str): Thư mục chứa các file drone.
+        skybrush_dir (str): Thư mục chứa các file drone. None takes every drone from the show manifest
+            of processed_dir, e.g. for shows imported from a .skyc bundle.
         config_file(str): Đường dẫn của file config cần cập nhật.
+        only (iterable, optional): Drone file names to read; rows of other drones are left as they are.
+        processed_dir (str, optional): Processed show directory whose show manifest provides the start
+            positions; drones missing from it are read from their Skybrush file.
 
     Returns:
     None
     """
     # Check if directories exist
-    if not os.path.exists(skybrush_dir):
+    if skybrush_dir is not None and not os.path.exists(skybrush_dir):
         print(f"Không tìm thấy thư mục: {skybrush_dir}")
         return
 
+    if only is not None and len(only) == 0:
+        print(f"Config file unchanged: {config_file}")
+        return
+
     # Load the config file
     config_df = pd.read_csv(config_file)
 
+    # Start positions already summarised at processing time
+    show_manifest = read_show_manifest(processed_dir) if processed_dir else None
+    drone_entries = show_manifest['drones'] if show_manifest else {}
+
     # Process all csv files in the skybrush directory
-    for filename in os.listdir(skybrush_dir):
-        if filename.endswith(".csv"):
+    if skybrush_dir is not None:
+        filenames = os.listdir(skybrush_dir)
+    else:
+        filenames = [f"Drone {drone_id}.csv" for drone_id in drone_entries]
+    for filename in filenames:
+        if filename.endswith(".csv") and (only is None or filename in only):
 
             try:
-                # Load csv data
-                filepath = os.path.join(skybrush_dir, filename)
-                df = pd.read_csv(filepath)
-
-                # Get the initial position
-                initial_x = df.loc[0, 'x [m]']
-                initial_y = df.loc[0, 'y [m]']
-
                 # Get the drone ID
                 drone_id = int(filename.replace('Drone', '').replace('.csv', ''))
 
+                # Get the initial position
+                entry = drone_entries.get(str(drone_id))
+                if entry is not None:
+                    initial_x, initial_y = entry['start'][0], entry['start'][1]
+                else:
+                    # Load csv data
+                    filepath = os.path.join(skybrush_dir, filename)
+                    df = pd.read_csv(filepath, nrows=1)
+                    initial_x = df.loc[0, 'x [m]']
+                    initial_y = df.loc[0, 'y [m]']
+
                 # Update the config file
                 config_df.loc[config_df['pos_id'] == drone_id, 'x'] = initial_x
                 config_df.loc[config_df['pos_id'] == drone_id, 'y'] = initial_y
@@ -9,7 +9,17 @@ from mavsdk.telemetry import *
 import subprocess
 import signal
 from collections import namedtuple
-import functions.global_to_local
+from functions.global_to_local import LocalFrame
+from functions.setpoint_sender import SetpointSender
+from functions.setpoint_trajectory import SetpointTrajectory
+from functions.show_manifest import read_show_manifest
+from functions.show_store import ShowStore, show_path, store_is_current
+from functions.slot_assignment import TransitionTrajectory, transition_move_time
+from functions.spline_trajectory import SplineTrajectory, spline_is_current, spline_path
+from functions.trajectory_simplify import read_simplified
+from functions.telemetry_hub import ConflatingStream, TelemetryHub
+from functions.tick_scheduler import TickScheduler
+from functions.fleet_playback import FleetMember, perform_fleet_trajectory
 import glob
 
 def read_hw_id():
@@ -32,6 +42,41 @@ DEFAULT_Z = 0.83
 GRPC_PORT_BASE = 50041
 #UDP_PORT_BASE = 14541
 SHOW_DEVIATIONS = False
+LATE_TICK_POLICY = "skip"
+#"skip": a late tick runs immediately and any older missed ticks are dropped
+#"catch_up": missed ticks are run back-to-back until the loop is on schedule again
+INTERPOLATE_SETPOINTS = True
+#if set to true, setpoints are interpolated at the exact send time between trajectory samples,
+#so STEP_TIME can be shorter than the sample spacing of the trajectory files
+USE_SPLINE_FILES = False
+#if set to true, "Drone N.spline.npz" written by process_drone_files(output='spline' or 'both') is played back
+#instead of the resampled CSV when it is current; off by default, so playback uses the processed samples
+USE_SIMPLIFIED_FILES = True
+#if set to true, "Drone N.simplified.traj" (or active.simplified.traj) written with SIMPLIFY is played back
+#when it is not older than the CSV; the removed samples are rebuilt by interpolation
+USE_SHOW_STORE = True
+#if set to true, the show store (show.npz) written by process_formation is loaded once and every drone
+#takes its trajectory from it instead of reading its own processed file
+FLEET_PLAYBACK = False
+#if set to true (SIM_MODE only), one shared tick loop computes and sends the setpoints of all drones
+#instead of one independent playback loop per drone
+FLEET_MAX_IN_FLIGHT = 1
+#maximum concurrent offboard sends per drone in fleet playback; a busy drone only keeps its newest unsent setpoint
+SETPOINT_MAX_IN_FLIGHT = 1
+#maximum concurrent offboard sends per drone in per-drone playback; sends never block the tick loop, and more than 1
+#hides longer gRPC round-trips but concurrent sends may reach mavsdk_server out of order
+TRANSITION_LEGS = True
+#if set to true, a drone whose config x, y is not the start point of its trajectory (e.g. after slot assignment)
+#first climbs, flies to the start point and descends onto it; all drones fly their legs together
+TRANSITION_SPEED = 1.0
+#speed in m/s of the drone with the longest move to its start point, the others move slower
+TRANSITION_ALTITUDE = 2.0
+#height in metres above the start point at which the drones move
+TRANSITION_CLIMB_TIME = 4.0
+#seconds for the climb before and the descent after the move
+CONFLATE_TELEMETRY = True
+#if set to true, telemetry is consumed latest-only: when the loop falls behind, only the newest message of each
+#stream is used and the skipped ones are counted, instead of working through a backlog of stale states
 Drone = namedtuple('Drone', 'hw_id pos_id x y ip mavlink_port debug_port gcs_ip')
 SIM_MODE = True
 #if set to false each drone will read its own HW_ID and initialize its offboard, otherwise all droness are being commanded
@@ -65,59 +110,80 @@ def read_config(filename):
 
     return dronesConfig
 
-def read_trajectory_file(filename, trajectory_offset, altitude_offset):
-    waypoints = []
-    with open(filename, newline="") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            t = float(row["t"])
-            px = float(row["px"]) + trajectory_offset[0]
-            py = float(row["py"]) + trajectory_offset[1]
-            pz = float(row["pz"]) + trajectory_offset[2] - altitude_offset
-            vx = float(row["vx"])
-            vy = float(row["vy"])
-            vz = float(row["vz"])
-            ax = float(row["ax"])
-            ay = float(row["ay"])
-            az = float(row["az"])
-            yaw = float(row["yaw"])
-            mode_code = int(row["mode"])  # Assuming the mode code is in a column named "mode"
-            waypoints.append((t, px, py, pz, vx, vy, vz, ax, ay, az,yaw, mode_code))
-    return waypoints
-
-
-
-global_position_telemetry = {}
-dronesConfig = read_config('config.csv')
 
+show_stores = {}
+
+
+def read_show_store(directory):
+    # Loaded once per directory and shared by every drone; a store older than the processed files is ignored
+    if directory not in show_stores:
+        show_stores[directory] = ShowStore.load(show_path(directory)) if store_is_current(directory) else None
+    return show_stores[directory]
+
+
+show_manifests = {}
+
+
+def read_manifest_entry(filename):
+    # Per-drone metadata written by process_formation, read once per directory
+    directory = os.path.dirname(filename)
+    if directory not in show_manifests:
+        show_manifests[directory] = read_show_manifest(directory)
+    manifest = show_manifests[directory]
+    drone_name = os.path.basename(filename)
+    if manifest is None or not drone_name.startswith("Drone "):
+        return None
+    return manifest['drones'].get(str(int(drone_name.replace('Drone', '').replace('.csv', ''))))
+
+
+transition_times = {}
 
 
+def transition_time():
+    # The same for every drone, from the whole config file (a real drone only has its own row in dronesConfig)
+    if 'move' not in transition_times:
+        transition_times['move'] = transition_move_time('config.csv', "shapes/swarm/processed", TRANSITION_SPEED)
+    return transition_times['move']
 
-async def get_global_position_telemetry(drone_id, drone):
-    async for global_position in drone.telemetry.position():
-        global_position_telemetry[drone_id] = global_position
-        pass
+
+def read_trajectory_file(filename, trajectory_offset, altitude_offset):
+    # Prefer the spline coefficients when available and current; they are evaluated exactly at every send time
+    if USE_SPLINE_FILES and spline_is_current(filename):
+        return SplineTrajectory.from_file(spline_path(filename), trajectory_offset, altitude_offset)
+    # Simplified files only keep the samples that interpolation cannot rebuild, so they are always interpolated
+    simplified = read_simplified(filename) if USE_SIMPLIFIED_FILES else None
+    if simplified is not None:
+        return SetpointTrajectory(simplified, trajectory_offset, altitude_offset, interpolate=True)
+    store = read_show_store(os.path.dirname(filename)) if USE_SHOW_STORE else None
+    drone_name = os.path.basename(filename)
+    if store is not None and drone_name.startswith("Drone "):
+        drone_id = int(drone_name.replace('Drone', '').replace('.csv', ''))
+        if drone_id in store:
+            return SetpointTrajectory(store.drone(drone_id), trajectory_offset, altitude_offset, INTERPOLATE_SETPOINTS)
+    # Memory-maps the .traj file next to the CSV when available, otherwise parses the CSV
+    return SetpointTrajectory.from_file(filename, trajectory_offset, altitude_offset, INTERPOLATE_SETPOINTS)
+
+
+
+telemetry_hubs = {}
+dronesConfig = read_config('config.csv')
 
 
 
 
-async def perform_trajectory(drone_id, drone, waypoints, home_position,home_position_NED, global_position_telemetry, mode_descriptions):
+async def perform_trajectory(drone_id, drone, trajectory, home_position,home_position_NED, telemetry_hub, mode_descriptions):
     print(f"-- Performing trajectory {drone_id}")
-    total_duration = waypoints[-1][0]
-    t = 0
+    total_duration = trajectory.duration
     last_mode = 0
-    last_waypoint_index = 0
+    scheduler = TickScheduler(STEP_TIME, LATE_TICK_POLICY)
+    sender = SetpointSender(drone.offboard, SETPOINT_MAX_IN_FLIGHT, f"Drone id {drone_id+1}")
+    # Reference ECEF position and rotation computed once for the whole show
+    home_frame = LocalFrame.from_position(home_position)
 
-    while t <= total_duration:
-        actual_position = global_position_telemetry[drone_id]
-        local_ned_position = functions.global_to_local.global_to_local(actual_position, home_position)
+    async for tick in scheduler.ticks(total_duration):
+        t = tick.t
         
-        current_waypoint = None
-        for i in range(last_waypoint_index, len(waypoints)):
-            if t <= waypoints[i][0]:
-                current_waypoint = waypoints[i]
-                last_waypoint_index = i
-                break
+        current_waypoint = trajectory.setpoint_at(t)
 
         if (SEPERATE_CSV == True):
             position = tuple(a-b for a, b in zip(current_waypoint[1:4], home_position_NED))
@@ -133,22 +199,18 @@ async def perform_trajectory(drone_id, drone, waypoints, home_position,home_posi
             print(f"Drone id: {drone_id+1}: Mode number: {mode_code}, Description: {mode_descriptions[mode_code]}")
             last_mode = mode_code
                 
-        await drone.offboard.set_position_velocity_acceleration_ned(
-            PositionNedYaw(*position, yaw),
-            VelocityNedYaw(*velocity, yaw),
-            AccelerationNed(*acceleration)
-        )
-
-        await asyncio.sleep(STEP_TIME)
-        t += STEP_TIME
-        
-        if int(t/STEP_TIME) % 100 == 0:
-            deviation = [(a - b) for a, b in zip(position, [local_ned_position.north_m, local_ned_position.east_m, local_ned_position.down_m])]
+        # Returns immediately; a slow round-trip only delays this setpoint, not the tick loop
+        sender.submit(position, velocity, acceleration, yaw)
+
+        if tick.index % 100 == 0:
+            local_ned_position = home_frame.position_to_ned(telemetry_hub.latest("position"))
+            deviation = [(a - b) for a, b in zip(position, local_ned_position)]
             if SHOW_DEVIATIONS == True:
                 print(f"Drone {drone_id+1} Deviations: {round(deviation[0], 1)} {round(deviation[1], 1)} {round(deviation[2], 1)}")
 
 
-    print(f"-- Shape completed {drone_id+1}")
+    await sender.drain()
+    print(f"-- Shape completed {drone_id+1}: {scheduler.summary()}; {sender.summary()}")
 
 
 async def initial_setup_and_connection(drone_id, udp_port):
@@ -177,26 +239,31 @@ async def initial_setup_and_connection(drone_id, udp_port):
     await drone.connect(system_address=f"udp://:{udp_port}")
     print(f"Drone connecting with UDP: {udp_port}")
 
-    # Ensure future telem data
-    asyncio.ensure_future(get_global_position_telemetry(drone_id, drone))
+    # One shared subscription per telemetry stream; start the position stream right away
+    telemetry_hubs[drone_id] = TelemetryHub(drone.telemetry, conflate=CONFLATE_TELEMETRY)
+    telemetry_hubs[drone_id].stream("position")
     
     # Check if the drone is connected
-    async for state in drone.core.connection_state():
+    connection_states = drone.core.connection_state()
+    if CONFLATE_TELEMETRY:
+        connection_states = ConflatingStream(connection_states)
+    async for state in connection_states:
         if state.is_connected:
             print(f"Drone id {drone_id+1} connected on Port: {udp_port} and grpc Port: {grpc_port}")
             break
+    if CONFLATE_TELEMETRY:
+        connection_states.close()
 
     return drone, mode_descriptions, home_position
 
 
 async def pre_flight_checks(drone_id, drone):
     # Wait for the drone to have a global position estimate
-    async for health in drone.telemetry.health():
-        if health.is_global_position_ok and health.is_home_position_ok:
-            print(f"Global position estimate ok {drone_id+1}")
-            home_position = global_position_telemetry[drone_id]
-            print(f"Home Position of {drone_id+1} set to: {home_position}")
-            break
+    telemetry_hub = telemetry_hubs[drone_id]
+    await telemetry_hub.wait_for("health", lambda health: health.is_global_position_ok and health.is_home_position_ok)
+    print(f"Global position estimate ok {drone_id+1}")
+    home_position = await telemetry_hub.wait_for("position")
+    print(f"Home Position of {drone_id+1} set to: {home_position}")
 
     return home_position
 
@@ -219,9 +286,7 @@ async def perform_landing(drone_id, drone):
     print(f"-- Landing {drone_id+1}")
     await drone.action.land()
 
-    async for state in drone.telemetry.landed_state():
-        if state == LandedState.ON_GROUND:
-            break
+    await telemetry_hubs[drone_id].wait_for("landed_state", lambda state: state == LandedState.ON_GROUND)
 
 async def stop_offboard_mode(drone_id, drone):
     print(f"-- Stopping offboard {drone_id+1}")
@@ -265,6 +330,9 @@ def start_mavsdk_servers(num_drones, udp_ports):
     return mavsdk_servers
 
 async def run_all_drones(num_drones,home_positions, traejctory_offset, udp_ports, time_offset, altitude_offsets):
+    if FLEET_PLAYBACK and SIM_MODE:
+        await run_fleet(num_drones, home_positions, traejctory_offset, udp_ports, altitude_offsets)
+        return
     tasks = []
     for i in range(num_drones):
         if (SIM_MODE == True):
@@ -274,15 +342,38 @@ async def run_all_drones(num_drones,home_positions, traejctory_offset, udp_ports
         tasks.append(asyncio.create_task(run_drone(drone_id,home_positions[i], traejctory_offset[i], udp_ports[i], i*time_offset, altitude_offsets[i])))
     await asyncio.gather(*tasks)
 
+async def run_fleet(num_drones, home_positions, traejctory_offset, udp_ports, altitude_offsets):
+    # Shared clock for all drones, so per-drone time offsets are not applied here
+    prepared = await asyncio.gather(*[
+        prepare_drone(i, traejctory_offset[i], udp_ports[i], 0, altitude_offsets[i]) for i in range(num_drones)
+    ])
+    members = []
+    for i, (drone, trajectory, mode_descriptions, home_position) in enumerate(prepared):
+        position_offset = home_positions[i] if SEPERATE_CSV else (0, 0, 0)
+        members.append(FleetMember(i, drone, trajectory, position_offset, telemetry_hubs[i], home_position))
+
+    await perform_fleet_trajectory(members, STEP_TIME, LATE_TICK_POLICY, FLEET_MAX_IN_FLIGHT, mode_descriptions, SHOW_DEVIATIONS)
+
+    await asyncio.gather(*[finish_drone(member.drone_id, member.drone) for member in members])
+
 def stop_all_mavsdk_servers(mavsdk_servers):
     # Kill all mavsdk_server processes
     for mavsdk_server in mavsdk_servers:
         os.kill(mavsdk_server.pid, signal.SIGTERM)
 
 
-async def run_drone(drone_id,home_position_NED, trajectory_offset, udp_port, time_offset, altitude_offset):
-    if (SIM_MODE == False):
-        drone_id = 0
+def trajectory_filename(drone_id):
+    # Each drone flies the trajectory of its pos_id in config.csv, which slot assignment may change
+    if SEPERATE_CSV:
+        if (SIM_MODE == False):
+            return "shapes/swarm/processed/Drone " + str(dronesConfig[0].pos_id) + ".csv"
+        else:
+            return "shapes/swarm/processed/Drone " + str(dronesConfig[drone_id].pos_id) + ".csv"
+    else:
+        return "shapes/active.csv"
+
+
+async def prepare_drone(drone_id, trajectory_offset, udp_port, time_offset, altitude_offset):
     # Call the initial setup and connection function
     drone, mode_descriptions, home_position = await initial_setup_and_connection(drone_id, udp_port)
     
@@ -296,18 +387,28 @@ async def run_drone(drone_id,home_position_NED, trajectory_offset, udp_port, tim
     # Arm the drone and start offboard mode
     await arming_and_starting_offboard_mode(drone_id, drone)
 
-    if SEPERATE_CSV:
-            if (SIM_MODE == False):
-                filename = "shapes/swarm/processed/Drone " + str(HW_ID) + ".csv"
-            else:
-                filename = "shapes/swarm/processed/Drone " + str(drone_id+1) + ".csv"    
-    else:
-        filename = "shapes/active.csv"
-        
-    waypoints = read_trajectory_file(filename, trajectory_offset, altitude_offset)
-    
-    await perform_trajectory(drone_id, drone, waypoints, home_position, home_position_NED, global_position_telemetry, mode_descriptions)
+    filename = trajectory_filename(drone_id)
+    trajectory = read_trajectory_file(filename, trajectory_offset, altitude_offset)
 
+    # The show manifest describes the trajectory without reading it; a different duration means stale files
+    entry = read_manifest_entry(filename)
+    if entry is not None:
+        print(f"-- Drone {drone_id+1}: {entry['duration']:.1f} s show, max speed {entry['max_speed']:.1f} m/s, max acceleration {entry['max_acceleration']:.1f} m/s²")
+        # A spline file ends at the last Skybrush point, up to one sample after the last processed sample
+        sample_time = entry['duration'] / max(entry['samples'] - 1, 1)
+        if abs(entry['duration'] - trajectory.duration) > 1.5 * sample_time:
+            print(f"-- Drone {drone_id+1}: {filename} does not match the show manifest, reprocess the show")
+
+    # Drones that do not stand on their start point fly to it first
+    move_time = transition_time() if SEPERATE_CSV and TRANSITION_LEGS else None
+    if move_time:
+        config = dronesConfig[0] if SIM_MODE == False else dronesConfig[drone_id]
+        trajectory = TransitionTrajectory(trajectory, (config.x, config.y), move_time, TRANSITION_ALTITUDE, TRANSITION_CLIMB_TIME)
+        print(f"-- Drone {drone_id+1}: flying to the start point first ({trajectory.leg_duration:.1f} s)")
+    return drone, trajectory, mode_descriptions, home_position
+
+
+async def finish_drone(drone_id, drone):
     # Perform landing
     await perform_landing(drone_id, drone)
 
@@ -317,6 +418,20 @@ async def run_drone(drone_id,home_position_NED, trajectory_offset, udp_port, tim
     # Disarm the drone
     await disarm_drone(drone_id, drone)
 
+    # Stop the telemetry subscriptions
+    print(f"-- Telemetry of drone {drone_id+1}: {telemetry_hubs[drone_id].summary()}")
+    telemetry_hubs[drone_id].close()
+
+
+async def run_drone(drone_id,home_position_NED, trajectory_offset, udp_port, time_offset, altitude_offset):
+    if (SIM_MODE == False):
+        drone_id = 0
+    drone, trajectory, mode_descriptions, home_position = await prepare_drone(drone_id, trajectory_offset, udp_port, time_offset, altitude_offset)
+    
+    await perform_trajectory(drone_id, drone, trajectory, home_position, home_position_NED, telemetry_hubs[drone_id], mode_descriptions)
+
+    await finish_drone(drone_id, drone)
+
 
 async def main():
     num_drones =  len(dronesConfig) 
@@ -1131,6 +1131,13 @@ class Offboard(AsyncBase):
     def _setup_stub(self, channel):
         """ Setups the api stub """
         self._stub = offboard_pb2_grpc.OffboardServiceStub(channel)
+        # Takes an already serialized request, for set_position_velocity_acceleration_ned_raw
+        self._set_position_velocity_acceleration_ned_bytes = channel.unary_unary(
+                '/mavsdk.rpc.offboard.OffboardService/SetPositionVelocityAccelerationNed',
+                request_serializer=None,
+                response_deserializer=offboard_pb2.SetPositionVelocityAccelerationNedResponse.FromString,
+                )
+        self._position_velocity_acceleration_request = offboard_pb2.SetPositionVelocityAccelerationNedRequest()
 
     
     def _extract_result(self, response):
@@ -1488,6 +1495,57 @@ class Offboard(AsyncBase):
             raise OffboardError(result, "set_position_velocity_acceleration_ned()", position_ned_yaw, velocity_ned_yaw, acceleration_ned)
         
 
+    async def set_position_velocity_acceleration_ned_raw(self, values):
+        """
+         Set the position, velocity and acceleration in NED coordinates from plain numbers.
+
+         Same command as set_position_velocity_acceleration_ned without the PositionNedYaw,
+         VelocityNedYaw and AccelerationNed objects: the values are written into one request
+         message kept by the plugin and serialized right away, so every call allocates only the
+         serialized bytes. The yaw is used for both the position and the velocity setpoint.
+
+         Parameters
+         ----------
+         values : sequence of float
+              north_m, east_m, down_m, north_m_s, east_m_s, down_m_s, north_m_s2, east_m_s2,
+              down_m_s2, yaw_deg; e.g. a NumPy row or setpoint[1:11] of a SetpointTrajectory
+
+         Raises
+         ------
+         OffboardError
+             If the request fails. The error contains the reason for the failure.
+        """
+
+        request = self._position_velocity_acceleration_request
+        north_m, east_m, down_m, north_m_s, east_m_s, down_m_s, north_m_s2, east_m_s2, down_m_s2, yaw_deg = values
+
+        position = request.position_ned_yaw
+        position.north_m = float(north_m)
+        position.east_m = float(east_m)
+        position.down_m = float(down_m)
+        position.yaw_deg = float(yaw_deg)
+
+        velocity = request.velocity_ned_yaw
+        velocity.north_m_s = float(north_m_s)
+        velocity.east_m_s = float(east_m_s)
+        velocity.down_m_s = float(down_m_s)
+        velocity.yaw_deg = float(yaw_deg)
+
+        acceleration = request.acceleration_ned
+        acceleration.north_m_s2 = float(north_m_s2)
+        acceleration.east_m_s2 = float(east_m_s2)
+        acceleration.down_m_s2 = float(down_m_s2)
+
+        # Serialized before the first await, so concurrent calls cannot see each other's values
+        response = await self._set_position_velocity_acceleration_ned_bytes(request.SerializeToString())
+
+        
+        result = self._extract_result(response)
+
+        if result.result != OffboardResult.Result.SUCCESS:
+            raise OffboardError(result, "set_position_velocity_acceleration_ned_raw()", values)
+        
+
     async def set_acceleration_ned(self, acceleration_ned):
         """
          Set the acceleration in NED coordinates.
@@ -46,12 +46,13 @@ Note:
 
 
 import asyncio
-import csv
 import os
 
 from mavsdk import System
 from mavsdk.offboard import PositionNedYaw, VelocityNedYaw, AccelerationNed , OffboardError
 from mavsdk.telemetry import LandedState
+from functions.setpoint_trajectory import SetpointTrajectory
+from functions.tick_scheduler import TickScheduler
 import subprocess
 import signal
 
@@ -103,47 +104,22 @@ async def run():
         await drone.action.disarm()
         return
 
-    waypoints = []
-
-    # Read data from the CSV file
-    with open("shapes/active.csv", newline="") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            t = float(row["t"])
-            px = float(row["px"])
-            py = float(row["py"])
-            pz = float(row["pz"])
-            vx = float(row["vx"])
-            vy = float(row["vy"])
-            vz = float(row["vz"])
-            ax = float(row["ax"])
-            ay = float(row["ay"])
-            az = float(row["az"])
-            yaw = float(row["yaw"])
-            mode_code = int(row["mode"])  # Assuming the mode code is in a column named "mode"
-        
-        
-            waypoints.append((t, px, py, pz, vx, vy, vz,ax,ay,az,mode_code))
+    # Read data from the CSV file (or the .traj file next to it)
+    trajectory = SetpointTrajectory.from_file("shapes/active.csv")
 
     print("-- Quỹ đạo biển diễn")
-    total_duration = waypoints[-1][0]  # Thời gian tổng cộng là thời gian của waypoint cuối cùng
-    t = 0  # Time variable
+    total_duration = trajectory.duration  # Thời gian tổng cộng là thời gian của waypoint cuối cùng
     last_mode = 0
-    while t <= total_duration:
+    scheduler = TickScheduler(0.1)  # Độ phân giải thời gian là 0.1 giây
+    async for tick in scheduler.ticks(total_duration):
+        t = tick.t  # Time variable, read from the clock
         # Xác định waypoint hiện tại dựa trên thời gian
-        current_waypoint = None
-        for waypoint in waypoints:
-            if t <= waypoint[0]:
-                current_waypoint = waypoint
-                break
-
-        if current_waypoint is None:
-            # Đã đến điểm cuối của quỹ đạo
-            break
+        current_waypoint = trajectory.setpoint_at(t)
 
         position = current_waypoint[1:4]  # Trích xuất vị trí (px, py, pz)
         velocity = current_waypoint[4:7]  # Trích xuất vận tốc (vx, vy, vz)
         acceleration = current_waypoint[7:10]  # Trích xuất gia tốc (ax, ay, az)
+        yaw = current_waypoint[10]
         mode_code = current_waypoint[-1]
         if last_mode != mode_code:
                 print(f" Mode number: {mode_code}, Description: {mode_descriptions[mode_code]}")
@@ -155,9 +131,6 @@ async def run():
             AccelerationNed(*acceleration)
         )
 
-        await asyncio.sleep(0.1)  # Độ phân giải thời gian là 0.1 giây
-        t += 0.1
-
     print("-- Hoàn thành hình dạng")
 
     print("-- Landing") # Hạ cánh
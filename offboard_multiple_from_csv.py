@@ -9,9 +9,10 @@
 import os
 import asyncio
 from mavsdk import System
-import csv
 from mavsdk.offboard import PositionNedYaw, VelocityNedYaw, AccelerationNed, OffboardError
 from mavsdk.telemetry import LandedState
+from functions.setpoint_trajectory import SetpointTrajectory
+from functions.tick_scheduler import TickScheduler
 from mavsdk.action import ActionError
 from mavsdk.telemetry import *
 import subprocess
@@ -86,49 +87,22 @@ async def run_drone(drone_id, trajectory_offset, udp_port, time_offset, altitude
         await drone.action.disarm()
         return
 
-    waypoints = []
-
-    # Đọc data từ file CSV
-    with open("shapes/active.csv", newline="") as csvfile:
-        
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            t = float(row["t"])
-            px = float(row["px"]) + trajectory_offset[0]
-            py = float(row["py"]) + trajectory_offset[1]
-            pz = float(row["pz"]) + trajectory_offset[2] -  altitude_offset
-            vx = float(row["vx"])
-            vy = float(row["vy"])
-            vz = float(row["vz"])
-            ax = float(row["ax"])
-            ay = float(row["ay"])
-            az = float(row["az"])
-            yaw = float(row["yaw"])
-            mode_code = int(row["mode"])
-            
-        
-            waypoints.append((t, px, py, pz, vx, vy, vz,ax,ay,az,mode_code))
+    # Đọc data từ file CSV (hoặc file .traj bên cạnh)
+    trajectory = SetpointTrajectory.from_file("shapes/active.csv", trajectory_offset, altitude_offset)
 
     print(f"-- Performing trajectory {drone_id}")
-    total_duration = waypoints[-1][0]  # Thời gian tổng cộng là thời gian của waypoint cuối cùng
-    t = 0  # Time variable
+    total_duration = trajectory.duration  # Thời gian tổng cộng là thời gian của waypoint cuối cùng
     last_mode = 0
-    while t <= total_duration:
-        
-                
+    scheduler = TickScheduler(0.1)  # Độ phân giải thời gian là 0.1 giây
+    async for tick in scheduler.ticks(total_duration):
+        t = tick.t  # Time variable, read from the clock
         # Find the current waypoint based on time
-        current_waypoint = None
-        for waypoint in waypoints:
-            if t <= waypoint[0]:
-                current_waypoint = waypoint
-                break
-
-        if current_waypoint is None:
-            break
+        current_waypoint = trajectory.setpoint_at(t)
 
         position = current_waypoint[1:4]  # Trích xuất vị trí (px, py, pz)
         velocity = current_waypoint[4:7]  # Trích xuất vận tốc (vx, vy, vz)
         acceleration = current_waypoint[7:10]  # Trích xuất gia tốc (ax, ay, az)
+        yaw = current_waypoint[10]
         mode_code = current_waypoint[-1]
         if last_mode != mode_code:
                 # Print the mode number and its description
@@ -141,9 +115,6 @@ async def run_drone(drone_id, trajectory_offset, udp_port, time_offset, altitude
             AccelerationNed(*acceleration)
         )
 
-        await asyncio.sleep(0.1)  # Độ phân giải thời gian là 0.1 giây
-        t += 0.1
-
     print(f"-- Hoàn thành hình dạng {drone_id}")
 
     print(f"-- Landing {drone_id}")
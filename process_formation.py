@@ -1,7 +1,16 @@
 # process_formation.py
 
+import os
+
+from functions.build_manifest import BuildManifest, file_hash
 from functions.plot_drone_paths import plot_drone_paths
-from functions.process_drone_files import process_drone_files
+from functions.process_drone_files import process_drone_files, processed_files, remove_outputs, run_processing
+from functions.separation_check import check_separation, print_separation_report
+from functions.show_manifest import read_show_manifest, write_show_manifest
+from functions.show_store import ShowStore, show_path
+from functions.skyc_import import process_skyc
+from functions.slot_assignment import assign_config_slots
+from functions.trajectory_simplify import simplify_file
 from functions.update_config_file import update_config_file
 
 # Process the drone files and output the processed data to another directory
@@ -9,13 +18,115 @@ skybrush_dir = 'shapes/swarm/skybrush'
 processed_dir = 'shapes/swarm/processed'
 method = 'cubic'
 dt = 0.05
+output = 'both'  # 'samples', 'spline' or 'both'; the show store, separation check and plots need the samples
+workers = None  # worker processes for file processing; None uses every CPU core, 1 is serial
+STREAMING = False  # read each file in chunks with local Akima/PCHIP windows, for very long shows ('cubic' becomes 'akima')
+chunk_rows = 10000  # keyframes per chunk when streaming
+SIMPLIFY = False  # also write 'Drone N.simplified.traj' with only the samples playback cannot interpolate
+position_tolerance = 0.02  # metres, largest position error of a removed sample
+velocity_tolerance = 0.05  # m/s
+acceleration_tolerance = 0.2  # m/s²; None leaves the (linearly interpolated) acceleration unbounded
 SHOW_PLOTS = True
+plot_max_points = 2000  # points drawn per path in the plots; None draws every sample
+INCREMENTAL = True  # only rebuild drones whose Skybrush file or processing settings changed
+manifest_file = 'shapes/swarm/processed/build_manifest.json'
+SKYC_FILE = None  # path of a Skybrush .skyc bundle to import directly instead of the CSV files in skybrush_dir
+CHECK_SEPARATION = True  # check every pair of drones at every time slice
+min_separation = 1.0  # metres
+ASSIGN_SLOTS = False  # choose which drone (hw_id) flies which trajectory (pos_id) from the current config positions; main flies each drone to its start point first
+assignment_objective = 'sum'  # 'sum' minimises the total flight distance, 'bottleneck' the longest flight
+
+
+# The guard is required for the worker processes, which re-import this module on spawn-based platforms
+if __name__ == "__main__":
+    if SKYC_FILE:
+        # Every drone of the bundle is rebuilt; incremental builds track the CSV files only
+        results = process_skyc(SKYC_FILE, processed_dir, method, dt, output=output, workers=workers)
+        source_dir = None
+        changed = None
+
+        # Outputs of drones the bundle does not have would still be played back and collected into the show store
+        listed = {result['filename'] for result in results or []}
+        removed = [filename for filename in processed_files(processed_dir) if filename not in listed] if results is not None else []
+        for filename in removed:
+            remove_outputs(os.path.join(processed_dir, filename))
+
+        # The processed files no longer come from the CSV files, so the next CSV build rebuilds every drone
+        manifest = BuildManifest(manifest_file)
+        for filename in list(manifest.inputs):
+            manifest.forget(filename)
+        manifest.save()
+    else:
+        manifest = BuildManifest(manifest_file)
+        settings = {'method': method, 'dt': dt, 'output': output, 'streaming': STREAMING,
+                    'simplify': [position_tolerance, velocity_tolerance, acceleration_tolerance] if SIMPLIFY else None}
+        if INCREMENTAL:
+            changes = manifest.changes(skybrush_dir, processed_dir, settings)
+            changed = set(changes)
+            print(f"{len(changed)} drone files changed: {sorted(changed)}")
+        else:
+            changes = {}
+            changed = None
+
+        results = process_drone_files(skybrush_dir, processed_dir, method, dt, output=output, workers=workers, only=changed,
+                                      streaming=STREAMING, chunk_rows=chunk_rows)
+
+        # Record successful builds so they are skipped next time
+        for result in results or []:
+            if result['ok']:
+                sha256 = changes.get(result['filename']) or file_hash(os.path.join(skybrush_dir, result['filename']))
+                manifest.record(result['filename'], sha256, settings)
+        # Outputs of a removed Skybrush file would still be played back and collected into the show store
+        removed = manifest.removed(skybrush_dir)
+        for filename in removed:
+            remove_outputs(os.path.join(processed_dir, filename))
+            manifest.forget(filename)
+        manifest.save()
+        source_dir = skybrush_dir
+
+    # Keyframe files for playback, which rebuilds the removed samples by interpolation
+    if SIMPLIFY and output in ('samples', 'both'):
+        jobs = [(result['output'], position_tolerance, velocity_tolerance, acceleration_tolerance)
+                for result in results or [] if result['ok']]
+        simplified = run_processing(simplify_file, jobs, workers)
+        samples = sum(result['samples'] for result in simplified)
+        kept = sum(result['kept'] for result in simplified)
+        if samples:
+            print(f"Simplified trajectories keep {kept}/{samples} samples ({100 * kept / samples:.1f}%)")
+
+    # Per-drone metadata (start/end, duration, bounds, limits, checksum) for the tools that should not read trajectories
+    show_manifest = read_show_manifest(processed_dir) or {}
+    drone_entries = show_manifest.get('drones', {}) if show_manifest.get('dt') == dt else {}
+    for result in results or []:
+        if result['ok']:
+            drone_entries[str(int(result['filename'].replace('Drone', '').replace('.csv', '')))] = result['manifest']
+    for filename in removed:
+        drone_entries.pop(str(int(filename.replace('Drone', '').replace('.csv', ''))), None)
+    write_show_manifest(processed_dir, drone_entries, dt)
 
+    # Collect every processed drone into one show store for the checks, the plots and playback
+    store = None
+    if output in ('samples', 'both'):
+        store = ShowStore.from_processed(processed_dir)
+        store.save(show_path(processed_dir))
+        print(f"Show store saved to {show_path(processed_dir)}")
+    elif os.path.exists(show_path(processed_dir)):
+        # Without samples there is nothing to rebuild it from, and an old store must not outlive its files
+        os.remove(show_path(processed_dir))
 
-process_drone_files(skybrush_dir, processed_dir, method, dt)
+    # Check the whole show for drones that come too close, not only the changed ones
+    if CHECK_SEPARATION and store is not None:
+        report = check_separation(store.positions, store.times, min_separation, store.drone_ids)
+        print_separation_report(report, min_separation)
 
-# Update the 'x' and 'y' columns of the config file with the initial position of each drone
-config_file = 'config.csv'
-update_config_file(skybrush_dir, config_file)
+    # Update the 'x' and 'y' columns of the config file with the initial position of each drone, or keep them and assign the trajectories
+    config_file = 'config.csv'
+    if ASSIGN_SLOTS:
+        assign_config_slots(source_dir, config_file, assignment_objective, processed_dir=processed_dir)
+    else:
+        update_config_file(source_dir, config_file, only=changed, processed_dir=processed_dir)
 
-plot_drone_paths(skybrush_dir, processed_dir,SHOW_PLOTS)
\ No newline at end of file
+    # The plots compare against the raw Skybrush CSV files, which a .skyc import does not have
+    if source_dir is not None:
+        plot_drone_paths(skybrush_dir, processed_dir,SHOW_PLOTS, only=changed, store=store, workers=workers,
+                         max_points=plot_max_points)